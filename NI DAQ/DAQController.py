@@ -1,39 +1,220 @@
+import queue
+import threading
+import time
+from collections import deque
+
 import nidaqmx
+from nidaqmx.constants import LineGrouping
 
 class DAQController:
     def __init__(self, device_name="Dev2"):
         self.device_name = device_name
         self.digital_states = {}  # Track valve states
+        # Tasks are created on first use and kept open; creating a task per call dominated latency
+        self._lock = threading.Lock()  # Analog tasks are used from DAQWorker, reconfigured from Tk
+        self._ai_channels = []
+        self._ai_task = None
+        self._ao_tasks = {}  # channel -> single-channel output task
+        self._do_tasks = {}  # port -> persistent whole-port output task
+        self._port_masks = {}  # port -> current value of the whole port, read once then tracked per write
 
     def set_device_name(self, device_name):
-        self.device_name = device_name
+        with self._lock:
+            self.device_name = device_name
+            self._close_analog_tasks()
+        self._close_do_tasks()
+        # A different device's ports are read afresh, and none of its lines count as written yet
+        self._port_masks = {}
+        self.digital_states = {}
+
+    def set_ai_channels(self, channels):
+        """Set the analog input channels read by read_all_voltages"""
+        with self._lock:
+            self._ai_channels = list(channels)
+            if self._ai_task is not None:
+                self._ai_task.close()
+                self._ai_task = None
+
+    def _close_analog_tasks(self):
+        if self._ai_task is not None:
+            self._ai_task.close()
+            self._ai_task = None
+        for task in self._ao_tasks.values():
+            task.close()
+        self._ao_tasks = {}
+
+    def _close_do_tasks(self):
+        for task in self._do_tasks.values():
+            task.close()
+        self._do_tasks = {}
+
+    def close(self):
+        """Release any persistent tasks"""
+        with self._lock:
+            self._close_analog_tasks()
+        self._close_do_tasks()
 
     def write_voltage(self, channel, voltage):
         """Write voltage to analog output channel (clamped to 0-5V)"""
-        clamped_voltage = max(0.0, min(5.0, voltage))
-
-        with nidaqmx.Task() as task:
-            task.ao_channels.add_ao_voltage_chan(
-                f"{self.device_name}/{channel}",
-                min_val=0.0,
-                max_val=5.0
-            )
+        clamped_voltage = 0.0 if voltage < 0.0 else (5.0 if voltage > 5.0 else voltage)
+
+        with self._lock:
+            # One task per channel so a missing channel only fails its own controller
+            task = self._ao_tasks.get(channel)
+            if task is None:
+                task = nidaqmx.Task()
+                try:
+                    task.ao_channels.add_ao_voltage_chan(
+                        f"{self.device_name}/{channel}",
+                        min_val=0.0,
+                        max_val=5.0
+                    )
+                except Exception:
+                    task.close()
+                    raise
+                self._ao_tasks[channel] = task
             task.write(clamped_voltage)
 
-    def read_voltage(self, channel):
-        """Read voltage from analog input channel"""
-        with nidaqmx.Task() as task:
-            task.ai_channels.add_ai_voltage_chan(f"{self.device_name}/{channel}")
-            return task.read()
+    def read_all_voltages(self):
+        """Read every configured analog input channel in a single task read"""
+        with self._lock:
+            if self._ai_task is None:
+                task = nidaqmx.Task()
+                try:
+                    for channel in self._ai_channels:
+                        task.ai_channels.add_ai_voltage_chan(f"{self.device_name}/{channel}")
+                except Exception:
+                    task.close()
+                    raise
+                self._ai_task = task
+
+            values = self._ai_task.read()
+        # A single-channel task returns a bare float
+        return values if isinstance(values, list) else [values]
 
     def write_digital(self, port_line, state):
         """Write digital output (on/off) to a specific port/line"""
-        with nidaqmx.Task() as task:
-            task.do_channels.add_do_chan(f"{self.device_name}/{port_line}")
-            task.write(bool(state))
+        self.write_lines([(port_line, state)])
+
+    def write_lines(self, line_states):
+        """Write several (port_line, state) pairs with a single write per port"""
+        self.write_compiled(self.compile_lines(line_states))
+
+    def compile_lines(self, line_states):
+        """Pack (port_line, state) pairs into per-port set/clear bitmasks for write_compiled()"""
+        port_bits = {}  # port -> [set_bits, clear_bits]
+        for port_line, state in line_states:
+            port, _, line = port_line.partition("/line")
+            bit = 1 << int(line)
+            bits = port_bits.setdefault(port, [0, 0])
+            if state:
+                bits[0] |= bit
+                bits[1] &= ~bit
+            else:
+                bits[1] |= bit
+                bits[0] &= ~bit
+        port_masks = tuple((port, set_bits, clear_bits) for port, (set_bits, clear_bits) in port_bits.items())
+        states = tuple((port_line, bool(state)) for port_line, state in line_states)
+        return port_masks, states
+
+    def write_compiled(self, compiled):
+        """Apply a batch from compile_lines(); lines not in the batch keep their state"""
+        port_masks, states = compiled
+        for port, set_bits, clear_bits in port_masks:
+            self._port_task(port)  # Seeds the port's current value on first use
+            self.write_port(port, (self._port_masks[port] & ~clear_bits) | set_bits)
+
         # Update state tracking
-        self.digital_states[port_line] = bool(state)
+        for port_line, state in states:
+            self.digital_states[port_line] = state
+
+    def write_port(self, port, value):
+        """Write every line of a digital port (e.g. "port1") at once from an integer bitmask"""
+        self._port_task(port).write(value)
+        self._port_masks[port] = value
+
+    def _port_task(self, port):
+        """Persistent whole-port output task. On creation the port's current output value is read,
+        so lines the app never writes keep whatever state they were in."""
+        task = self._do_tasks.get(port)
+        if task is None:
+            task = nidaqmx.Task()
+            try:
+                task.do_channels.add_do_chan(
+                    f"{self.device_name}/{port}",
+                    line_grouping=LineGrouping.CHAN_FOR_ALL_LINES
+                )
+            except Exception:
+                task.close()
+                raise
+            self._do_tasks[port] = task
+
+            if port not in self._port_masks:
+                try:
+                    self._port_masks[port] = int(task.read())
+                except Exception:
+                    # Devices that can't read back their outputs start from all lines off
+                    self._port_masks[port] = 0
+        return task
 
     def read_digital_state(self, port_line):
         """Read last set digital state"""
-        return self.digital_states.get(port_line, False)
\ No newline at end of file
+        return self.digital_states.get(port_line, False)
+
+
+class DAQWorker:
+    """Runs analog reads and queued DAQ writes on a background thread.
+
+    Driver calls can stall for tens of milliseconds; keeping them off the
+    Tk thread keeps the GUI responsive. The newest reading is left in
+    ``readings`` and failed writes are reported through ``errors``.
+    """
+
+    def __init__(self, daq, read_interval):
+        self.daq = daq
+        self.read_interval = read_interval  # seconds between analog reads
+        self.readings = deque(maxlen=1)  # Latest voltages only
+        self.errors = queue.SimpleQueue()
+        self._requests = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, join_timeout=1.0):
+        self._stop.set()
+        self._requests.put(None)  # Wake the thread if it is waiting for work
+        if self._thread:
+            self._thread.join(timeout=join_timeout)
+            self._thread = None
+
+    def submit(self, description, func, *args):
+        """Queue func(*args) to run on the DAQ thread; failures are reported as 'description: error'"""
+        self._requests.put((description, func, args))
+
+    def _run(self):
+        next_read = time.monotonic()
+        while not self._stop.is_set():
+            # Service writes until the next read is due
+            timeout = next_read - time.monotonic()
+            if timeout > 0:
+                try:
+                    request = self._requests.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                if request is not None:
+                    description, func, args = request
+                    try:
+                        func(*args)
+                    except Exception as e:
+                        self.errors.put(f"{description}: {e}")
+                continue
+
+            next_read = time.monotonic() + self.read_interval
+            try:
+                self.readings.append(self.daq.read_all_voltages())
+            except Exception:
+                # Fail silently for read errors to avoid spamming
+                pass
@@ -1,25 +1,26 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, Menu
 import time
-from datetime import datetime, timedelta
 from Flowrate import MFCManager
-from DAQController import DAQController
-from ConfigWindow import ConfigWindow
+from DAQController import DAQController, DAQWorker
 from ValveControlFrame import ValveControlFrame
 from ValveScheduler import ValveScheduler
+from ScheduleCoordinator import ScheduleCoordinator
+from TickScheduler import TickScheduler
 
 
 class MFCControlFrame(tk.LabelFrame):
-    def __init__(self, parent, index, daq, mfc_manager, channel_config, *args, **kwargs):
+    def __init__(self, parent, index, daq, daq_worker, mfc_manager, mfc_names, channel_config, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
         self.daq = daq
+        self.daq_worker = daq_worker
         self.mfc_manager = mfc_manager
         self.index = index
         self.channel_config = channel_config
 
         # Channel info labels
         self.channel_info = tk.StringVar()
-        ttk.Label(self, textvariable=self.channel_info, font=("Arial", 8)).grid(
+        ttk.Label(self, textvariable=self.channel_info, style="Info.TLabel").grid(
             row=0, column=0, columnspan=4, sticky="w", padx=5
         )
 
@@ -27,7 +28,7 @@ class MFCControlFrame(tk.LabelFrame):
         ttk.Label(self, text="MFC Type:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
         self.mfc_var = tk.StringVar()
         self.mfc_dropdown = ttk.Combobox(self, textvariable=self.mfc_var, state="readonly", width=12)
-        self.mfc_dropdown['values'] = self.mfc_manager.get_all_mfc_names()
+        self.mfc_dropdown['values'] = mfc_names
         self.mfc_dropdown.grid(row=1, column=1, padx=5, pady=5, columnspan=3, sticky="w")
 
         # Set flow section
@@ -47,6 +48,8 @@ class MFCControlFrame(tk.LabelFrame):
         # Actual flow section
         ttk.Label(self, text="Actual Flow:").grid(row=3, column=0, padx=5, pady=5, sticky="e")
         self.actual_flow_var = tk.StringVar(value="0.0")
+        self._last_flow_str = "0.0"  # Last value written to actual_flow_var
+        self._last_voltage = None  # Voltage behind _last_flow_str
         ttk.Label(self, textvariable=self.actual_flow_var, width=8).grid(row=3, column=1, padx=5, pady=5, sticky="w")
 
         # Actual flow unit display
@@ -55,23 +58,25 @@ class MFCControlFrame(tk.LabelFrame):
 
         # Scaling information
         self.scaling_info = tk.StringVar()
-        ttk.Label(self, textvariable=self.scaling_info, font=("Arial", 8)).grid(
+        ttk.Label(self, textvariable=self.scaling_info, style="Info.TLabel").grid(
             row=4, column=0, columnspan=4, sticky="w", padx=5
         )
 
         # Initialize
-        if self.mfc_dropdown['values']:
-            self.mfc_var.set(self.mfc_dropdown['values'][0])
-            self.update_unit_display()
-            self.update_scaling_info()
+        self._current_mfc = None  # Cached lookup of mfc_var, refreshed on change
+        if mfc_names:
+            self.mfc_var.set(mfc_names[0])
+            self.on_mfc_change()
 
-        # Bind MFC selection change
-        self.mfc_var.trace_add("write", self.on_mfc_change)
+        # Bind MFC selection change (user selections only, not programmatic sets)
+        self.mfc_dropdown.bind("<<ComboboxSelected>>", self.on_mfc_change)
 
-        # Update channel labels
-        self.update_channel_info()
+        # Cache channel names and update channel labels
+        self.refresh_channels()
 
     def on_mfc_change(self, *args):
+        self._current_mfc = self.mfc_manager.get_mfc(self.mfc_var.get())
+        self._last_voltage = None  # Same voltage now means a different flow
         self.update_unit_display()
         self.update_scaling_info()
 
@@ -89,14 +94,18 @@ class MFCControlFrame(tk.LabelFrame):
             self.set_unit_var.set(unit)
             self.actual_unit_var.set(unit)
 
+    def refresh_channels(self):
+        """Re-read this controller's channels from channel_config after a configuration change"""
+        self._ao = self.channel_config[self.index]['ao']
+        self._ai = self.channel_config[self.index]['ai']
+        self.update_channel_info()
+
     def update_channel_info(self):
         """Update channel information display"""
-        ao = self.channel_config[self.index]['ao']
-        ai = self.channel_config[self.index]['ai']
-        self.channel_info.set(f"Output: {ao} | Input: {ai}")
+        self.channel_info.set(f"Output: {self._ao} | Input: {self._ai}")
 
     def get_current_mfc(self):
-        return self.mfc_manager.get_mfc(self.mfc_var.get())
+        return self._current_mfc
 
     def set_flow(self):
         try:
@@ -107,38 +116,36 @@ class MFCControlFrame(tk.LabelFrame):
 
             flow = float(self.flow_var.get())
             voltage = mfc.flow_to_voltage(flow)
-            ao_channel = self.channel_config[self.index]['ao']
-            self.daq.write_voltage(ao_channel, voltage)
+            # Written on the DAQ thread; failures come back through MainApp.update_readings
+            self.daq_worker.submit("Failed to set flow", self.daq.write_voltage, self._ao, voltage)
         except (ValueError, AttributeError) as e:
             messagebox.showerror("Input Error", f"Invalid flow value: {e}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to set flow: {str(e)}")
 
-    def update_reading(self):
-        try:
-            mfc = self.get_current_mfc()
-            if not mfc:
-                return
+    def update_reading_from_voltage(self, voltage):
+        """Show the flow for a voltage already read from this frame's input channel"""
+        mfc = self.get_current_mfc()
+        if not mfc or voltage == self._last_voltage:
+            return
 
-            ai_channel = self.channel_config[self.index]['ai']
-            voltage = self.daq.read_voltage(ai_channel)
-            flow = mfc.voltage_to_flow(voltage)
-            self.actual_flow_var.set(f"{flow:.2f}")
-        except Exception as e:
-            # Fail silently for read errors to avoid spamming
-            pass
+        # The ADC is quantised, so a steady flow often repeats the exact same voltage
+        self._last_voltage = voltage
+        flow_str = format(mfc.voltage_to_flow(voltage), ".2f")
+        if flow_str != self._last_flow_str:
+            self._last_flow_str = flow_str
+            self.actual_flow_var.set(flow_str)
 
 
 class ScheduledRunTab(ttk.Frame):
-    def __init__(self, parent, daq, valve_config, *args, **kwargs):
+    def __init__(self, parent, daq, valve_config, tick_scheduler, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
         self.daq = daq
+        self.tick_scheduler = tick_scheduler
         self.valve_config = valve_config
         self.swap_job_ids = []
+        self.schedule_coordinator = ScheduleCoordinator(daq, tick_scheduler)
         self.recording = False
         self.auto_run_job = None
         self.next_run_time = None
-        self.position_job = None
 
         # Configure grid for columns
         for i in range(4):
@@ -156,6 +163,8 @@ class ScheduledRunTab(ttk.Frame):
             pos_var = tk.StringVar(value="OFF")
             ttk.Label(frame, textvariable=pos_var, width=5).pack(side=tk.LEFT)
             self.valve_position_vars.append(pos_var)
+        # Tcl variable names, for batched updates in show_valve_positions
+        self._pos_var_names = [str(var) for var in self.valve_position_vars]
 
         # Run controls frame (middle)
         self.control_frame = ttk.LabelFrame(self, text="Run Controls", padding=10)
@@ -193,6 +202,7 @@ class ScheduledRunTab(ttk.Frame):
         for i in range(4):
             scheduler = ValveScheduler(
                 self, i, daq, valve_config,
+                position_changed_callback=self.show_valve_position,
                 padding=10,
                 relief="groove"
             )
@@ -202,60 +212,44 @@ class ScheduledRunTab(ttk.Frame):
     def toggle_auto_run(self):
         if self.auto_run_var.get():
             self.start_auto_run_scheduler()
-        elif self.auto_run_job:
-            self.master.after_cancel(self.auto_run_job)
+        elif self.auto_run_job is not None:
+            self.tick_scheduler.cancel(self.auto_run_job)
             self.auto_run_job = None
             self.next_run_time = None
             self.next_run_var.set("Next run: --:--:--")
 
     def calculate_next_run(self):
-        """Calculate next run time at exact second interval."""
-        now = datetime.now()
+        """Calculate next run time (epoch seconds) at exact second interval."""
+        now = int(time.time())
         try:
             interval_seconds = int(self.interval_var.get())
         except ValueError:
             interval_seconds = 300
 
-        current_seconds = now.hour * 3600 + now.minute * 60 + now.second
-        remainder = current_seconds % interval_seconds
-
-        if remainder == 0:
-            next_seconds = current_seconds
-        else:
-            next_seconds = current_seconds + interval_seconds - remainder
-
-        next_hour = next_seconds // 3600
-        next_minute = (next_seconds % 3600) // 60
-        next_second = next_seconds % 60
-
-        next_run = now.replace(hour=next_hour, minute=next_minute,
-                               second=next_second, microsecond=0)
-
-        if next_hour >= 24:
-            next_run = next_run + timedelta(days=1)
-
-        return next_run
+        # Runs line up on multiples of the interval counted from local midnight
+        midnight = now - (now + time.localtime(now).tm_gmtoff) % 86400
+        elapsed_intervals = -(-(now - midnight) // interval_seconds)  # ceiling division
+        return midnight + elapsed_intervals * interval_seconds
 
     def start_auto_run_scheduler(self):
         if not self.auto_run_var.get():
             return
 
         self.next_run_time = self.calculate_next_run()
-        self.next_run_var.set(f"Next run: {self.next_run_time.strftime('%H:%M:%S')}")
+        self.next_run_var.set(f"Next run: {time.strftime('%H:%M:%S', time.localtime(self.next_run_time))}")
 
-        now = datetime.now()
-        delay_ms = int((self.next_run_time - now).total_seconds() * 1000)
+        delay_ms = int((self.next_run_time - time.time()) * 1000)
 
-        if self.auto_run_job:
-            self.master.after_cancel(self.auto_run_job)
-        self.auto_run_job = self.master.after(delay_ms, self.execute_auto_run)
+        if self.auto_run_job is not None:
+            self.tick_scheduler.cancel(self.auto_run_job)
+        self.auto_run_job = self.tick_scheduler.schedule(delay_ms, self.execute_auto_run)
 
     def execute_auto_run(self):
         if not self.auto_run_var.get():
             return
 
         self.start_recording()
-        self.auto_run_job = self.master.after(
+        self.auto_run_job = self.tick_scheduler.schedule(
             int(self.interval_var.get()) * 1000,
             self.start_auto_run_scheduler
         )
@@ -268,18 +262,23 @@ class ScheduledRunTab(ttk.Frame):
         self.start_btn.config(state="disabled")
         self.stop_btn.config(state="normal")
 
-        # Set initial states for all valves
-        for scheduler in self.valve_schedulers:
-            scheduler.set_initial_state()
+        # Set initial states for all valves in one write per port
+        initial_states = [(scheduler, scheduler.get_initial_state()) for scheduler in self.valve_schedulers]
+        self._write_changed_lines([(scheduler.port_line, state) for scheduler, state in initial_states])
+        self.show_valve_positions([
+            (scheduler.valve_index, state) for scheduler, state in initial_states
+            if scheduler.track_state(state, notify=False)
+        ])
 
         # Schedule valve swaps
         for scheduler in self.valve_schedulers:
-            scheduler.schedule_actions(self.master)
+            scheduler.schedule_actions(self.schedule_coordinator)
+        self.schedule_coordinator.start()
 
         # Schedule run end
         try:
             duration = float(self.duration_var.get())
-            job_id = self.master.after(
+            job_id = self.tick_scheduler.schedule(
                 int(duration * 1000),
                 self.stop_recording
             )
@@ -287,17 +286,25 @@ class ScheduledRunTab(ttk.Frame):
         except ValueError:
             messagebox.showerror("Invalid Duration", "Please enter a valid number for run duration")
 
-        # Start updating valve positions
-        self.update_valve_positions()
-
-    def update_valve_positions(self):
-        """Update valve position display"""
-        for i, scheduler in enumerate(self.valve_schedulers):
-            self.valve_position_vars[i].set("ON" if scheduler.current_state else "OFF")
-
-        # Continue updating if recording
-        if self.recording:
-            self.position_job = self.after(500, self.update_valve_positions)
+    def _write_changed_lines(self, line_states):
+        """Write only the lines whose last written state differs; lines never written are always written"""
+        # Checked against the DAQ's record rather than each scheduler's, since the manual valve controls share these lines
+        written = self.daq.digital_states
+        changed = [(port_line, state) for port_line, state in line_states if written.get(port_line) != state]
+        if changed:
+            self.daq.write_lines(changed)
+
+    def show_valve_position(self, valve_index, state):
+        """Update valve position display; called by a scheduler when its valve changes state"""
+        self.valve_position_vars[valve_index].set("ON" if state else "OFF")
+
+    def show_valve_positions(self, changes):
+        """Update several valve position displays with a single Tcl call"""
+        if not changes:
+            return
+        self.tk.eval("; ".join(
+            f"set {self._pos_var_names[i]} {'ON' if state else 'OFF'}" for i, state in changes
+        ))
 
     def stop_recording(self):
         if not self.recording:
@@ -307,24 +314,20 @@ class ScheduledRunTab(ttk.Frame):
 
         # Cancel all swap jobs
         for job_id in self.swap_job_ids:
-            self.master.after_cancel(job_id)
+            self.tick_scheduler.cancel(job_id)
         self.swap_job_ids = []
 
-        # Cancel valve schedules
-        for scheduler in self.valve_schedulers:
-            scheduler.cancel_schedules()
-            scheduler.turn_off()
-
-        # Cancel position updates
-        if self.position_job:
-            self.after_cancel(self.position_job)
+        # Cancel valve schedules and turn every valve off in one write per port
+        self.schedule_coordinator.cancel()
+        self._write_changed_lines([(scheduler.port_line, False) for scheduler in self.valve_schedulers])
+        self.show_valve_positions([
+            (scheduler.valve_index, False) for scheduler in self.valve_schedulers
+            if scheduler.track_state(False, notify=False)
+        ])
 
         self.start_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
 
-        # Final position update
-        self.update_valve_positions()
-
 
 class MainApp(tk.Tk):
     def __init__(self):
@@ -332,6 +335,12 @@ class MainApp(tk.Tk):
         self.title("MFC & Valve Control System")
         self.geometry("1000x700")
 
+        # Shared label styles, so each widget doesn't build its own font
+        style = ttk.Style(self)
+        style.configure("Info.TLabel", font=("Arial", 8))
+        style.configure("Valve.TLabel", font=("Arial", 10, "bold"))
+        style.configure("Heading.TLabel", font=("Arial", 12, "bold"))
+
         # Initialize managers
         self.mfc_manager = MFCManager()
         self.daq = DAQController()
@@ -352,6 +361,15 @@ class MainApp(tk.Tk):
             {"name": "Valve 4", "port_line": "port1/line3"},
         ]
 
+        # Read all controller inputs through one task, off the Tk thread
+        self.daq.set_ai_channels(config['ai'] for config in self.channel_config)
+        self.update_interval = 1000  # ms between MFC readings
+        self.poll_interval = 50  # ms between checks for new readings
+        self.daq_worker = DAQWorker(self.daq, self.update_interval / 1000)
+
+        # All timed GUI work shares one Tk timer
+        self.tick_scheduler = TickScheduler(self)
+
         # Add available MFCs with output range 5.0V
         self.populate_mfcs()
 
@@ -370,7 +388,8 @@ class MainApp(tk.Tk):
         self.control_frames = []
         for i in range(4):
             frame = MFCControlFrame(
-                self.mfc_tab, i, self.daq, self.mfc_manager, self.channel_config,
+                self.mfc_tab, i, self.daq, self.daq_worker, self.mfc_manager, self.mfc_names,
+                self.channel_config,
                 text=f"MFC Controller {i + 1}", padx=10, pady=10
             )
             frame.grid(row=i // 2, column=i % 2, padx=10, pady=10, sticky="nsew")
@@ -398,13 +417,13 @@ class MainApp(tk.Tk):
 
         # Create scheduled run frame
         self.schedule_frame = ScheduledRunTab(
-            self.schedule_tab, self.daq, self.valve_config,
+            self.schedule_tab, self.daq, self.valve_config, self.tick_scheduler,
             padding=10
         )
         self.schedule_frame.pack(fill='both', expand=True)
 
-        # Setup periodic updates for MFC readings
-        self.update_interval = 1000  # ms
+        # Start reading MFCs and displaying the results
+        self.daq_worker.start()
         self.update_readings()
 
     def create_menu(self):
@@ -419,12 +438,15 @@ class MainApp(tk.Tk):
 
     def open_config(self):
         """Open the configuration window"""
+        # Imported here since most sessions never open it
+        from ConfigWindow import ConfigWindow
         ConfigWindow(self, self.daq, self.channel_config, self.valve_config)
 
     def update_channel_labels(self):
         """Update channel info in all control frames"""
+        self.daq.set_ai_channels(config['ai'] for config in self.channel_config)
         for frame in self.control_frames:
-            frame.update_channel_info()
+            frame.refresh_channels()
 
     def update_valve_config(self):
         """Update valve configuration in frames"""
@@ -448,7 +470,23 @@ class MainApp(tk.Tk):
         for name, max_flow, output_range in mfc_specs:
             self.mfc_manager.add_mfc(name, max_flow, output_range)
 
+        # Shared by every controller's dropdown
+        self.mfc_names = tuple(self.mfc_manager.get_all_mfc_names())
+
     def update_readings(self):
-        for frame in self.control_frames:
-            frame.update_reading()
-        self.after(self.update_interval, self.update_readings)
\ No newline at end of file
+        """Show the newest readings and any write errors from the DAQ thread"""
+        if self.daq_worker.readings:
+            voltages = self.daq_worker.readings.pop()
+            for frame, voltage in zip(self.control_frames, voltages):
+                frame.update_reading_from_voltage(voltage)
+
+        # Reschedule before reporting errors, so an open error dialog doesn't stall the polling
+        self.tick_scheduler.schedule(self.poll_interval, self.update_readings)
+
+        while not self.daq_worker.errors.empty():
+            self.after_idle(messagebox.showerror, "Error", self.daq_worker.errors.get())
+
+    def destroy(self):
+        self.daq_worker.stop()
+        self.daq.close()
+        super().destroy()
@@ -5,30 +5,30 @@ class MFC:
         self.unit = "SLPM" if "SLPM" in name else "SCCM"
         self.output_range = output_range  # Voltage range for feedback signal
 
+        # Conversion factors are fixed per MFC, so work them out once.
+        # A non-positive max_flow makes both conversions return 0.
+        if max_flow > 0:
+            self._flow_to_v = 5.0 / max_flow
+            self._v_to_flow = max_flow / output_range
+            # voltage to flow rate not reading correct values? lets calibrate it.
+            self._cal_const = (-0.2681 * max_flow) - 0.1454
+        else:
+            self._flow_to_v = 0.0
+            self._v_to_flow = 0.0
+            self._cal_const = 0.0
+
     def flow_to_voltage(self, flow_rate):
         """Convert flow rate to voltage (0-5V scale) based on MFC capacity"""
-        if self.max_flow <= 0:
+        if self._flow_to_v == 0:
             return 0.0
 
-        # Calculate voltage proportionally to max flow
-        voltage = (flow_rate / self.max_flow) * 5.0
-
         # Clamp between 0-5V to prevent out-of-range errors
-        return max(0.0, min(5.0, voltage))
+        voltage = flow_rate * self._flow_to_v
+        return 0.0 if voltage < 0.0 else (5.0 if voltage > 5.0 else voltage)
 
     def voltage_to_flow(self, voltage):
         """Convert voltage to flow rate based on MFC capacity and output range"""
-        if self.max_flow <= 0:
-            return 0.0
-        # Scale based on MFC output range
-        raw_value = (voltage / self.output_range) * self.max_flow
-
-        # voltage to flow rate not reading correct values? lets calibrate it.
-        calibration_constant = (-0.2681 * self.max_flow) - 0.1454
-
-        calibrated_value = raw_value - calibration_constant
-
-        return calibrated_value
+        return voltage * self._v_to_flow - self._cal_const
 
 class MFCManager:
     def __init__(self):
@@ -0,0 +1,70 @@
+import time
+
+
+class ScheduleCoordinator:
+    """Merges every valve's swap schedule into one timeline.
+
+    Valve schedulers register their (time_ms, state) changes; start()
+    sorts them into steps, one per distinct time, and each step changes all
+    of its valves with one DAQ write per port. Only the next step is ever
+    queued on the tick scheduler, so cancelling a run is a single cancel.
+    """
+
+    def __init__(self, daq, tick_scheduler):
+        self.daq = daq
+        self._write_compiled = daq.write_compiled
+        self.tick_scheduler = tick_scheduler
+        self._timeline = {}  # time_ms -> [(scheduler, state), ...]
+        self._steps = []  # (time_ms, compiled_lines, changes) in time order
+        self._next_step = 0
+        self._start_ms = 0.0
+        self._job_id = None
+
+    def register_all(self, scheduler, times_ms, states):
+        """Add a valve's changes from parallel lists of times and states"""
+        timeline = self._timeline
+        for time_ms, state in zip(times_ms, states):
+            timeline.setdefault(time_ms, []).append((scheduler, state))
+
+    def start(self):
+        """Start running everything registered so far, timed from now"""
+        self._cancel_job()
+        self._steps = []
+        for time_ms in sorted(self._timeline):
+            changes = self._timeline[time_ms]
+            # Pack each step into port bitmasks now so firing is just the write and the bookkeeping
+            lines = self.daq.compile_lines([(scheduler.port_line, state) for scheduler, state in changes])
+            self._steps.append((time_ms, lines, changes))
+        self._timeline = {}
+        self._next_step = 0
+        self._start_ms = time.monotonic() * 1000
+        self._schedule_next()
+
+    def cancel(self):
+        """Stop the running timeline and drop anything registered but not started"""
+        self._cancel_job()
+        self._steps = []
+        self._timeline = {}
+
+    def _cancel_job(self):
+        if self._job_id is not None:
+            self.tick_scheduler.cancel(self._job_id)
+            self._job_id = None
+
+    def _schedule_next(self):
+        if self._next_step >= len(self._steps):
+            self._job_id = None
+            return
+        # Delays are measured from the run start so steps do not drift
+        deadline = self._start_ms + self._steps[self._next_step][0]
+        self._job_id = self.tick_scheduler.schedule(deadline - time.monotonic() * 1000, self._fire)
+
+    def _fire(self):
+        _, lines, changes = self._steps[self._next_step]
+        self._next_step += 1
+        try:
+            self._write_compiled(lines)
+            for scheduler, state in changes:
+                scheduler.track_state(state)
+        finally:
+            self._schedule_next()
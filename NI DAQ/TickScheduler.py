@@ -0,0 +1,83 @@
+import heapq
+import itertools
+import math
+import sys
+import time
+
+
+class TickScheduler:
+    """Runs timed callbacks for the whole app from a single Tk timer.
+
+    Jobs wait in a heap ordered by deadline and only one after() is ever
+    pending, armed for the earliest deadline. Every job that is due when
+    it fires runs in the same pass. Cancelled jobs are dropped lazily
+    when they reach the top of the heap. The timer callback is registered
+    with Tcl once and reused, rather than wrapped anew by every after().
+    The timer for later jobs is armed before the due jobs run, so a job
+    that blocks in a nested event loop (e.g. a modal dialog) doesn't hold
+    up the rest of the schedule.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._heap = []  # (deadline_ms, job_id)
+        self._jobs = {}  # job_id -> (callback, args) for jobs not yet run or cancelled
+        self._ids = itertools.count()
+        self._timer = None
+        self._timer_deadline = None
+        self._tick_cmd = root.register(self._tick)
+
+    def schedule(self, delay_ms, callback, *args):
+        """Run callback(*args) after delay_ms; returns a job id for cancel()"""
+        job_id = next(self._ids)
+        self._jobs[job_id] = (callback, args)
+        heapq.heappush(self._heap, (self._now_ms() + max(0, delay_ms), job_id))
+        self._arm()
+        return job_id
+
+    def cancel(self, job_id):
+        """Cancel a job; unknown or already-run ids are ignored"""
+        self._jobs.pop(job_id, None)
+
+    def _now_ms(self):
+        return time.monotonic() * 1000
+
+    def _arm(self):
+        """Point the Tk timer at the earliest live deadline"""
+        while self._heap and self._heap[0][1] not in self._jobs:
+            heapq.heappop(self._heap)
+
+        if not self._heap:
+            if self._timer:
+                self.root.tk.call("after", "cancel", self._timer)
+                self._timer = None
+            return
+
+        deadline = self._heap[0][0]
+        if self._timer and self._timer_deadline <= deadline:
+            return  # Already waking up in time
+
+        if self._timer:
+            self.root.tk.call("after", "cancel", self._timer)
+        delay = max(0, math.ceil(deadline - self._now_ms()))
+        self._timer = self.root.tk.call("after", delay, self._tick_cmd)
+        self._timer_deadline = deadline
+
+    def _tick(self):
+        self._timer = None
+        now = self._now_ms()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, job_id = heapq.heappop(self._heap)
+            job = self._jobs.pop(job_id, None)
+            if job is not None:  # Otherwise cancelled
+                due.append(job)
+
+        # Arm for the remaining jobs first, so they still fire if a callback below blocks
+        self._arm()
+        for callback, args in due:
+            try:
+                callback(*args)
+            except Exception:
+                # Report like a normal Tk callback error and keep running the other jobs
+                self.root.report_callback_exception(*sys.exc_info())
@@ -3,20 +3,25 @@ from tkinter import ttk, messagebox
 
 
 class ValveControlFrame(tk.LabelFrame):
+    ON_CLR = "#39FF14"  # Neon green
+    OFF_CLR = "#FF5F1F"  # Neon orange
+    IDLE_CLR = "SystemButtonFace"  # Default color
+
     def __init__(self, parent, daq, valve_config, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
         self.daq = daq
         self.valve_config = valve_config
         self.valve_states = {}
-        self.on_buttons = {}
-        self.off_buttons = {}
+        self.valve_buttons = {}  # port_line -> (on_btn, off_btn)
+        self._shown_states = {}  # port_line -> state the button colors currently show
 
         # Title
-        ttk.Label(self, text="Valve Control", font=("Arial", 12, "bold")).grid(
+        ttk.Label(self, text="Valve Control", style="Heading.TLabel").grid(
             row=0, column=0, columnspan=4, pady=10
         )
 
-        # Create regular buttons (not ttk) for full color control
+        # Create regular buttons (not ttk) for full color control;
+        # the native Windows ttk theme ignores button background colors
         for i, valve in enumerate(self.valve_config):
             # Valve name
             ttk.Label(self, text=valve["name"]).grid(row=i + 1, column=0, padx=10, pady=5, sticky="w")
@@ -26,24 +31,23 @@ class ValveControlFrame(tk.LabelFrame):
                 self,
                 text="ON",
                 width=6,
-                bg="SystemButtonFace",  # Default color
-                activebackground="SystemButtonFace",
+                bg=self.IDLE_CLR,
+                activebackground=self.IDLE_CLR,
                 command=lambda v=valve["port_line"]: self.set_valve(v, True)
             )
             on_btn.grid(row=i + 1, column=1, padx=5, pady=5)
-            self.on_buttons[valve["port_line"]] = on_btn
 
             # OFF button (regular tk.Button)
             off_btn = tk.Button(
                 self,
                 text="OFF",
                 width=6,
-                bg="SystemButtonFace",  # Default color
-                activebackground="SystemButtonFace",
+                bg=self.IDLE_CLR,
+                activebackground=self.IDLE_CLR,
                 command=lambda v=valve["port_line"]: self.set_valve(v, False)
             )
             off_btn.grid(row=i + 1, column=2, padx=5, pady=5)
-            self.off_buttons[valve["port_line"]] = off_btn
+            self.valve_buttons[valve["port_line"]] = (on_btn, off_btn)
 
             # Store state indicator
             self.valve_states[valve["port_line"]] = tk.StringVar(value="OFF")
@@ -56,30 +60,25 @@ class ValveControlFrame(tk.LabelFrame):
     def set_valve(self, port_line, state):
         try:
             self.daq.write_digital(port_line, state)
-            self.valve_states[port_line].set("ON" if state else "OFF")
-
-            # Update button colors directly
-            if state:
-                self.on_buttons[port_line].config(bg="#39FF14", activebackground="#39FF14")  # Neon green
-                self.off_buttons[port_line].config(bg="SystemButtonFace", activebackground="SystemButtonFace")
-            else:
-                self.on_buttons[port_line].config(bg="SystemButtonFace", activebackground="SystemButtonFace")
-                self.off_buttons[port_line].config(bg="#FF5F1F", activebackground="#FF5F1F")  # Neon orange
-
+            self.show_state(port_line, state)
         except Exception as e:
             messagebox.showerror("Valve Error", f"Failed to control valve: {str(e)}")
 
+    def show_state(self, port_line, state):
+        """Update the state label and button colors, skipping Tk calls if nothing changed"""
+        if self._shown_states.get(port_line) == state:
+            return
+        self._shown_states[port_line] = state
+        self.valve_states[port_line].set("ON" if state else "OFF")
+
+        on_btn, off_btn = self.valve_buttons[port_line]
+        on_clr = self.ON_CLR if state else self.IDLE_CLR
+        off_clr = self.IDLE_CLR if state else self.OFF_CLR
+        on_btn.config(bg=on_clr, activebackground=on_clr)
+        off_btn.config(bg=off_clr, activebackground=off_clr)
+
     def update_valve_ports(self):
         """Update valve ports after configuration change"""
         for i, valve in enumerate(self.valve_config):
             port_line = valve['port_line']
-            state = self.daq.read_digital_state(port_line)
-            self.valve_states[port_line].set("ON" if state else "OFF")
-
-            # Update button colors
-            if state:
-                self.on_buttons[port_line].config(bg="#39FF14", activebackground="#39FF14")
-                self.off_buttons[port_line].config(bg="SystemButtonFace", activebackground="SystemButtonFace")
-            else:
-                self.on_buttons[port_line].config(bg="SystemButtonFace", activebackground="SystemButtonFace")
-                self.off_buttons[port_line].config(bg="#FF5F1F", activebackground="#FF5F1F")
\ No newline at end of file
+            self.show_state(port_line, self.daq.read_digital_state(port_line))
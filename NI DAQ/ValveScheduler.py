@@ -1,22 +1,25 @@
 import tkinter as tk
+from operator import itemgetter
 from tkinter import ttk
 
 
 class ValveScheduler(ttk.LabelFrame):
-    def __init__(self, parent, valve_index, daq, valve_config, *args, **kwargs):
+    def __init__(self, parent, valve_index, daq, valve_config, *args,
+                 position_changed_callback=None, **kwargs):
         super().__init__(parent, *args, **kwargs)
         self.daq = daq
         self.valve_index = valve_index
         self.valve_config = valve_config
         self.port_line = valve_config[valve_index]['port_line']
-        self.swap_job_ids = []
         self.current_state = False  # Track current valve state
+        # Called as callback(valve_index, state) whenever current_state actually changes
+        self.position_changed_callback = position_changed_callback
 
         # Configure grid for column layout
         self.columnconfigure(0, weight=1)
 
         # Valve label
-        ttk.Label(self, text=f"Valve {valve_index + 1} Schedule", font=("Arial", 10, "bold")).grid(
+        ttk.Label(self, text=f"Valve {valve_index + 1} Schedule", style="Valve.TLabel").grid(
             row=0, column=0, padx=5, pady=5, sticky="w"
         )
 
@@ -47,91 +50,129 @@ class ValveScheduler(ttk.LabelFrame):
         ttk.Button(btn_frame, text="+ Add Swap", command=self.add_swap_row).pack(side=tk.LEFT)
         ttk.Button(btn_frame, text="- Remove Last", command=self.remove_last_swap).pack(side=tk.LEFT, padx=5)
 
-        # Store swap variables
-        self.swap_vars = []
+        # Swap variables keyed by row frame, in insertion (display) order
+        self.swap_rows = {}
+        # Hidden rows kept for reuse as (row, time_var, action_var)
+        self._row_pool = []
+        # Parsed time per row, kept current as the entry is edited; None if invalid
+        self._row_times = {}
+        # Sorted schedule from get_schedule, reset whenever a row changes
+        self._schedule_cache = None
 
         # Add one initial row
         self.add_swap_row()
 
     def add_swap_row(self):
         """Add a new row to the valve schedule table"""
+        if self._row_pool:
+            # Reuse a removed row rather than building its widgets again
+            row, time_var, action_var = self._row_pool.pop()
+            time_var.set("0.0")
+            action_var.set(1)
+            row.pack(fill=tk.X, pady=2)
+            self.swap_rows[row] = (time_var, action_var)
+            self._invalidate_schedule()
+            return
+
         row = ttk.Frame(self.swap_rows_frame)
-        row.pack(fill=tk.X, pady=2)
 
         # Time entry
         time_var = tk.StringVar(value="0.0")
+        time_var.trace_add("write", lambda *_, r=row, v=time_var: self._parse_row_time(r, v))
+        self._parse_row_time(row, time_var)
         time_ent = ttk.Entry(row, width=8, textvariable=time_var)
         time_ent.pack(side=tk.LEFT)
 
-        # Action selection
-        action_var = tk.StringVar(value="ON")
-        action_cmb = ttk.Combobox(row, width=8, textvariable=action_var, state="readonly")
-        action_cmb['values'] = ("ON", "OFF")
-        action_cmb.pack(side=tk.LEFT, padx=5)
+        # Action selection: checked turns the valve ON, unchecked turns it OFF
+        action_var = tk.IntVar(value=1)
+        action_var.trace_add("write", self._invalidate_schedule)
+        action_chk = ttk.Checkbutton(row, text="ON", width=8, variable=action_var, onvalue=1, offvalue=0)
+        action_chk.pack(side=tk.LEFT, padx=5)
 
         # Remove button
         remove_btn = ttk.Button(row, text="Remove", width=8, command=lambda r=row: self.remove_swap_row(r))
         remove_btn.pack(side=tk.RIGHT)
 
+        # Show the row only once its children are laid out, so it is sized in one pass
+        row.pack(fill=tk.X, pady=2)
+
         # Store variables
-        self.swap_vars.append((time_var, action_var, row))
+        self.swap_rows[row] = (time_var, action_var)
+        self._invalidate_schedule()
 
     def remove_swap_row(self, row):
         """Remove a specific row from the valve schedule"""
-        for i, (time_var, action_var, row_widget) in enumerate(self.swap_vars):
-            if row_widget == row:
-                self.swap_vars.pop(i)
-                row.destroy()
-                break
+        swap_vars = self.swap_rows.pop(row, None)
+        if swap_vars is not None:
+            row.pack_forget()
+            self._row_pool.append((row, *swap_vars))
+            self._invalidate_schedule()
 
     def remove_last_swap(self):
         """Remove the last swap from the schedule"""
-        if self.swap_vars:
-            _, _, row = self.swap_vars.pop()
-            row.destroy()
+        if self.swap_rows:
+            self.remove_swap_row(next(reversed(self.swap_rows)))
+
+    def _parse_row_time(self, row, time_var):
+        """Cache the row's time as a float, or None if it is not a valid non-negative number"""
+        try:
+            time_val = float(time_var.get())
+        except ValueError:
+            time_val = None
+        self._row_times[row] = time_val if time_val is not None and time_val >= 0 else None
+        self._schedule_cache = None
+
+    def _invalidate_schedule(self, *_):
+        self._schedule_cache = None
 
     def get_schedule(self):
-        """Get the schedule for this valve"""
+        """Get the schedule for this valve as (time_s, state) pairs sorted by time"""
+        if self._schedule_cache is not None:
+            return self._schedule_cache
+
         schedule = []
-        for time_var, action_var, _ in self.swap_vars:
-            try:
-                time_val = float(time_var.get())
-                action_val = action_var.get()
-                if time_val >= 0:
-                    schedule.append((time_val, action_val))
-            except ValueError:
-                pass  # Skip invalid entries
-        return sorted(schedule, key=lambda x: x[0])
-
-    def set_initial_state(self):
-        """Set the initial state for this valve"""
-        state = self.initial_state_var.get() == "ON"
-        self.current_state = state
-        self.daq.write_digital(self.port_line, state)
-
-    def schedule_actions(self, master):
-        """Schedule all actions for this valve"""
-        schedule = self.get_schedule()
-        for time_val, action_val in schedule:
-            state = action_val == "ON"
-            job_id = master.after(
-                int(time_val * 1000),
-                lambda s=state: self.set_valve_state(s)
-            )
-            self.swap_job_ids.append(job_id)
-
-    def set_valve_state(self, state):
-        """Set valve state and track current state"""
+        row_times = self._row_times
+        for row, (_, action_var) in self.swap_rows.items():
+            time_val = row_times[row]
+            if time_val is not None:  # Skip invalid entries
+                schedule.append((time_val, bool(action_var.get())))
+        schedule.sort(key=itemgetter(0))  # Stable, so rows at the same time keep their order
+        self._schedule_cache = schedule
+        return schedule
+
+    def get_initial_state(self):
+        """Get the selected initial state (True for ON)"""
+        return self.initial_state_var.get() == "ON"
+
+    def compile_schedule(self):
+        """Reduce the schedule to the valve's actual state changes as parallel (times_ms, states) lists"""
+        # Later rows at the same instant win; dict order stays sorted by time
+        final_states = {}
+        for time_val, state in self.get_schedule():
+            final_states[int(time_val * 1000)] = state
+
+        # Swaps that would not change the valve are dropped
+        times_ms = []
+        states = []
+        state_now = self.get_initial_state()
+        for time_ms, state in final_states.items():
+            if state != state_now:
+                times_ms.append(time_ms)
+                states.append(state)
+                state_now = state
+        return times_ms, states
+
+    def schedule_actions(self, coordinator):
+        """Register this valve's state changes with the shared schedule coordinator"""
+        times_ms, states = self.compile_schedule()
+        if times_ms:  # Nothing to queue if the valve never changes
+            coordinator.register_all(self, times_ms, states)
+
+    def track_state(self, state, notify=True):
+        """Record a state that has already been written to the valve; returns True if it changed"""
+        if state == self.current_state:
+            return False
         self.current_state = state
-        self.daq.write_digital(self.port_line, state)
-
-    def cancel_schedules(self):
-        """Cancel all scheduled jobs for this valve"""
-        for job_id in self.swap_job_ids:
-            self.master.after_cancel(job_id)
-        self.swap_job_ids = []
-
-    def turn_off(self):
-        """Turn off this valve"""
-        self.current_state = False
-        self.daq.write_digital(self.port_line, False)
\ No newline at end of file
+        if notify and self.position_changed_callback:
+            self.position_changed_callback(self.valve_index, state)
+        return True
@@ -0,0 +1,23 @@
+# BoardProbe.py
+from mcculw import ul
+from mcculw.enums import DigitalPortType
+
+# Boards that have answered a probe and ports already set to output, shared by every module on this
+# board; failures aren't remembered, so a board plugged in later is still found
+_boardsFound: set[int] = set()
+_outputPorts: set[tuple[int, DigitalPortType]] = set()
+
+
+def checkBoard(board_num: int) -> None:
+    """Raise ULError if the board isn't there. Boards already found aren't asked again."""
+    if board_num not in _boardsFound:
+        ul.get_board_name(board_num)
+        _boardsFound.add(board_num)
+
+
+def configOutputPort(board_num: int, port: DigitalPortType) -> None:
+    """Check the board is there and set the port to output, skipping whatever was already done."""
+    checkBoard(board_num)
+    if (board_num, port) not in _outputPorts:
+        ul.d_config_port(board_num, port, 1)
+        _outputPorts.add((board_num, port))
@@ -1,19 +1,20 @@
 import time
-import queue
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
-from datetime import datetime, timedelta
 import math
+from functools import partial
 
+import numpy as np
 import matplotlib
 
 matplotlib.use("TkAgg")
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 
 from DataAcquisition import DataAcquisition
 from Valves import Valves
+from SpscRing import SpscRing
 from Settings import settings
 
 
@@ -43,19 +44,25 @@ class Display:
         self.notebook.add(self.config_tab, text="Configuration")
 
         self.daq = DataAcquisition()
-        self.dataQueue = queue.Queue()
-        self.daq.attach_queue(self.dataQueue)
+        # Blocks from the acquisition thread; a few seconds of slack in case the GUI stalls
+        self.dataRing = SpscRing(1024, self.daq.blockSize + 1)
+        self.daq.attach_ring(self.dataRing)
 
-        self.blockMS = max(
-            1,
-            round(1000 * self.daq.blockSize / self.daq.samplingFrequency),
-        )
+        # Sample period and block period, computed once
+        self.dt = 1.0 / self.daq.samplingFrequency
+        self.blockDt = self.daq.blockSize * self.dt
+        self.blockMS = max(1, round(self.blockDt * 1000))
+        # Time of each sample in a block relative to the block's timestamp, which is taken at its last sample
+        self._blockOffsets = (np.arange(self.daq.blockSize) - (self.daq.blockSize - 1)) * self.dt
 
         # Run-state
         self.recording = False
         self.maxDuration = settings.effective_run_duration
-        self.currentValve = "A"
+        self.currentValve = None  # Valve last opened through _setValveState; None until one is driven
         self.swap_job_ids = []  # List to store all swap job IDs
+        self._tickCount = 0  # updateLoop ticks, for plot redraw decimation
+        self._durDebounceId = None  # Pending _applyDuration after an edit
+        self._intDebounceId = None  # Pending _applyAutoInterval after an edit
 
         # Auto-run state
         self.auto_run_job = None
@@ -63,13 +70,16 @@ class Display:
 
         # Initialize valves after settings
         self.valves = Valves()
+        # Warnings are shown once the window has painted, so a missing board doesn't block the first frame
         if not hasattr(self.daq, '_hardware_available') or not self.daq._hardware_available:
-            messagebox.showwarning("Hardware Not Found",
-                                   f"Analog input board {settings.ai_board_number} not found. Running in simulation mode.")
+            self.root.after_idle(lambda: messagebox.showwarning(
+                "Hardware Not Found",
+                f"Analog input board {settings.ai_board_number} not found. Running in simulation mode."))
 
         if not hasattr(self.valves, '_hardware_available') or not self.valves._hardware_available:
-            messagebox.showwarning("Hardware Not Found",
-                                   f"Digital I/O board {settings.dio_board_number} not found. Valve controls will be simulated.")
+            self.root.after_idle(lambda: messagebox.showwarning(
+                "Hardware Not Found",
+                f"Digital I/O board {settings.dio_board_number} not found. Valve controls will be simulated."))
 
         # Build GUI
         self._build_widgets()
@@ -134,6 +144,36 @@ class Display:
         self.config_status = tk.StringVar(value="")
         ttk.Label(config_frm, textvariable=self.config_status, foreground="blue").pack()
 
+        # Display options (take effect immediately, even while recording)
+        display_frm = ttk.LabelFrame(self.config_tab, text="Display", padding=10)
+        display_frm.pack(fill=tk.X, padx=10, pady=(0, 10))
+
+        decim_frm = ttk.Frame(display_frm)
+        decim_frm.pack(fill=tk.X, pady=5)
+        ttk.Label(decim_frm, text="Redraw plot every").pack(side=tk.LEFT, padx=(0, 10))
+        self.display_decimation_var = tk.IntVar(value=settings.display_decimation)
+        decim_spin = ttk.Spinbox(decim_frm, from_=1, to=50, width=5,
+                                 textvariable=self.display_decimation_var,
+                                 command=self._update_display_decimation)
+        decim_spin.pack(side=tk.LEFT)
+        decim_spin.bind("<FocusOut>", self._update_display_decimation)
+        decim_spin.bind("<Return>", self._update_display_decimation)
+        ttk.Label(decim_frm, text="blocks").pack(side=tk.LEFT, padx=(5, 0))
+
+        # Data file options (apply from the next run started)
+        file_frm = ttk.LabelFrame(self.config_tab, text="Data File", padding=10)
+        file_frm.pack(fill=tk.X, padx=10, pady=(0, 10))
+
+        format_frm = ttk.Frame(file_frm)
+        format_frm.pack(fill=tk.X, pady=5)
+        ttk.Label(format_frm, text="Save format:").pack(side=tk.LEFT, padx=(0, 10))
+        self.data_format_var = tk.StringVar(value=settings.data_format)
+        format_cmb = ttk.Combobox(format_frm, width=8, textvariable=self.data_format_var,
+                                  values=("text", "binary"), state="readonly")
+        format_cmb.pack(side=tk.LEFT)
+        format_cmb.bind("<<ComboboxSelected>>", self._update_data_format)
+        ttk.Label(format_frm, text="text: tab-separated .txt   binary: float64 pairs .bin").pack(side=tk.LEFT, padx=(10, 0))
+
     def _build_control_tab(self):
         """Build the main control tab"""
         # Top bar
@@ -192,18 +232,21 @@ class Display:
             wraplength=500
         ).grid(row=1, column=0, columnspan=6, sticky="w", pady=(0, 5))
 
-        # Live readouts
+        # Live readouts (fixed width so changing text never resizes the canvas below)
         ttk.Label(info, text="Time Elapsed (s):").grid(row=2, column=0, sticky="w")
         self.timeVar = tk.StringVar(value="0.0000")
-        ttk.Label(info, textvariable=self.timeVar).grid(row=2, column=1, padx=(4, 20))
+        ttk.Label(info, textvariable=self.timeVar, width=10).grid(row=2, column=1, padx=(4, 20))
 
         ttk.Label(info, text="Current Signal (V):").grid(row=2, column=2, sticky="w")
         self.signalVar = tk.StringVar(value="0.0000")
-        ttk.Label(info, textvariable=self.signalVar).grid(row=2, column=3, padx=(4, 20))
+        ttk.Label(info, textvariable=self.signalVar, width=10).grid(row=2, column=3, padx=(4, 20))
 
         ttk.Label(info, text="Time Remaining (s):").grid(row=2, column=4, sticky="w")
         self.remainingVar = tk.StringVar(value="0.0000")
-        ttk.Label(info, textvariable=self.remainingVar).grid(row=2, column=5)
+        ttk.Label(info, textvariable=self.remainingVar, width=10).grid(row=2, column=5)
+
+        # Last text written to each readout, so unchanged values skip the Tcl call
+        self._timeStr = self._sigStr = self._remStr = "0.0000"
 
         # Run-duration row
         dur = ttk.Frame(info)
@@ -320,23 +363,27 @@ class Display:
         valve_f = ttk.Frame(main, padding=(20, 0))
         valve_f.pack(side=tk.RIGHT, anchor="ne")
 
-        self.buttonA = tk.Button(valve_f, text="Open A", width=10, bg=self.CLOSED_CLR, command=self.toggleValveA)
+        self.buttonA = tk.Button(valve_f, text="Open A", width=10, bg=self.CLOSED_CLR,
+                                 command=lambda: self._setValveState("A"))
         self.buttonA.pack(pady=(0, 5))
 
-        self.buttonB = tk.Button(valve_f, text="Open B", width=10, bg=self.CLOSED_CLR, command=self.toggleValveB)
+        self.buttonB = tk.Button(valve_f, text="Open B", width=10, bg=self.CLOSED_CLR,
+                                 command=lambda: self._setValveState("B"))
         self.buttonB.pack()
 
-        # Matplotlib figure
-        self.fig, self.ax = plt.subplots(figsize=(6, 4))
-        self.ax.set_xlabel("Time (s)")
-        self.ax.set_ylabel("Signal (V)")
-
-        self.line, = self.ax.plot([], [], lw=1.3)
+        # valve -> (Valves method that opens it, its manual button)
+        self._valveTable = {
+            "A": (Valves.set_valve_position_a, self.buttonA),
+            "B": (Valves.set_valve_position_b, self.buttonB),
+        }
 
-        FigureCanvasTkAgg(self.fig, master=self.control_tab).get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        if settings.plot_backend == "tkcanvas":
+            self._buildTkTrace()
+        else:
+            self._buildMplPlot()
 
-        self.xData = []
-        self.yData = []
+        # Plot history: preallocated arrays, of which the first _n entries are filled
+        self._resetPlotData()
 
     # ──────────────────────────────────────────────────────────
     #  Configuration methods
@@ -365,15 +412,30 @@ class Display:
             settings.dio_board_number = dio_board
             settings.ai_channel = ai_channel
 
-            # Reinitialize hardware
+            # Reinitialize hardware; the new board's valve state is unknown, so the next swap always writes
             self.valves = Valves()
+            self.currentValve = None
+            self.daq.close()  # Let any pending save finish before the old instance goes
             self.daq = DataAcquisition()
-            self.daq.attach_queue(self.dataQueue)
+            self.daq.attach_ring(self.dataRing)
 
             self.config_status.set("Configuration updated successfully")
         except ValueError as e:
             messagebox.showerror("Error", f"Invalid configuration: {str(e)}")
 
+    def _update_display_decimation(self, event=None):
+        """Update plot redraw decimation from GUI"""
+        try:
+            decimation = int(self.display_decimation_var.get())
+        except (ValueError, tk.TclError):
+            return
+        if decimation >= 1:
+            settings.display_decimation = decimation
+
+    def _update_data_format(self, event=None):
+        """Update the data file format from GUI"""
+        settings.data_format = self.data_format_var.get()
+
     # ──────────────────────────────────────────────────────────
     #  Valve schedule management
     # ──────────────────────────────────────────────────────────
@@ -425,21 +487,26 @@ class Display:
             _, _, row = self.swap_vars.pop()
             row.destroy()
 
-    def _get_valve_schedule(self) -> list[tuple[float, str]]:
-        """Get the current valve schedule from the UI"""
-        schedule = []
+    def _get_valve_schedule(self) -> tuple[np.ndarray, np.ndarray]:
+        """Get the current valve schedule from the UI as (times, valves) arrays sorted by time"""
+        times = []
+        valves = []
         for time_var, valve_var, _ in self.swap_vars:
             try:
                 time_val = float(time_var.get())
                 valve_val = valve_var.get()
                 if time_val >= 0 and valve_val in ("A", "B"):
-                    schedule.append((time_val, valve_val))
+                    times.append(time_val)
+                    valves.append(valve_val)
                 else:
                     messagebox.showerror("Invalid Input",
                                          f"Invalid valve schedule: time={time_val}, valve={valve_val}")
             except ValueError:
                 messagebox.showerror("Invalid Input", "Time must be a number")
-        return sorted(schedule, key=lambda x: x[0])
+        times = np.array(times, dtype=np.float64)
+        valves = np.array(valves, dtype="<U1")
+        order = np.argsort(times, kind="stable")
+        return times[order], valves[order]
 
     # ──────────────────────────────────────────────────────────
     #  Directory selection
@@ -463,20 +530,34 @@ class Display:
         self.durationVar.set(str(seconds))
 
     def _update_duration(self, event=None):
-        """Update from GUI entry"""
+        """Update from GUI entry (debounced: <Return> and <FocusOut> often fire together)"""
+        if self._durDebounceId:
+            self.root.after_cancel(self._durDebounceId)
+        self._durDebounceId = self.root.after(200, self._applyDuration)
+
+    def _applyDuration(self):
+        self._durDebounceId = None
         try:
             seconds = float(self.durationVar.get())
-            settings.run_duration = seconds
         except ValueError:
-            pass
+            return
+        if seconds != settings.run_duration:
+            settings.run_duration = seconds
 
     def _update_auto_interval(self, event=None):
-        """Update auto-run interval from GUI"""
+        """Update auto-run interval from GUI (debounced like _update_duration)"""
+        if self._intDebounceId:
+            self.root.after_cancel(self._intDebounceId)
+        self._intDebounceId = self.root.after(200, self._applyAutoInterval)
+
+    def _applyAutoInterval(self):
+        self._intDebounceId = None
         try:
             interval = int(self.autoIntVar.get())
-            settings.auto_run_interval = interval
         except ValueError:
-            pass
+            return
+        if interval != settings.auto_run_interval:
+            settings.auto_run_interval = interval
 
     # ──────────────────────────────────────────────────────────
     #  Auto-run methods
@@ -496,34 +577,15 @@ class Display:
             self.next_run_time = None
             self.nextRunVar.set("Next run: --:--:--")
 
-    def _calculate_next_run(self):
-        """Calculate next run time at exact second interval."""
-        now = datetime.now()
+    def _calculate_next_run(self) -> int:
+        """Calculate next run time (epoch seconds) at exact second interval."""
+        now = int(time.time())
         interval_seconds = settings.auto_run_interval
 
-        # Calculate next time that is multiple of interval seconds
-        current_seconds = now.hour * 3600 + now.minute * 60 + now.second
-        remainder = current_seconds % interval_seconds
-
-        if remainder == 0:
-            # Already at interval, run immediately
-            next_seconds = current_seconds
-        else:
-            next_seconds = current_seconds + interval_seconds - remainder
-
-        # Convert seconds back to time
-        next_hour = next_seconds // 3600
-        next_minute = (next_seconds % 3600) // 60
-        next_second = next_seconds % 60
-
-        # Create next run time
-        next_run = now.replace(hour=next_hour, minute=next_minute, second=next_second, microsecond=0)
-
-        # Handle day rollover
-        if next_hour >= 24:
-            next_run = next_run + timedelta(days=1)
-
-        return next_run
+        # Runs line up on multiples of the interval counted from local midnight
+        midnight = now - (now + time.localtime(now).tm_gmtoff) % 86400
+        elapsed_intervals = -(-(now - midnight) // interval_seconds)  # ceiling division
+        return midnight + elapsed_intervals * interval_seconds
 
     def _start_auto_run_scheduler(self):
         if not settings.auto_run:
@@ -531,11 +593,10 @@ class Display:
 
         # Calculate next run time
         self.next_run_time = self._calculate_next_run()
-        self.nextRunVar.set(f"Next run: {self.next_run_time.strftime('%H:%M:%S')}")
+        self.nextRunVar.set(f"Next run: {time.strftime('%H:%M:%S', time.localtime(self.next_run_time))}")
 
         # Calculate delay in milliseconds
-        now = datetime.now()
-        delay_ms = int((self.next_run_time - now).total_seconds() * 1000)
+        delay_ms = max(0, int((self.next_run_time - time.time()) * 1000))
 
         # Schedule next run
         if self.auto_run_job:
@@ -559,14 +620,15 @@ class Display:
     #  Valve helpers
     # ──────────────────────────────────────────────────────────
     def _setValveState(self, valve: str):
-        if valve == "A":
-            self.valves.set_valve_position_a()
-            self.buttonA.config(bg=self.OPEN_CLR)
-            self.buttonB.config(bg=self.CLOSED_CLR)
-        else:
-            self.valves.set_valve_position_b()
-            self.buttonB.config(bg=self.OPEN_CLR)
-            self.buttonA.config(bg=self.CLOSED_CLR)
+        # Always write, so clicking the open valve again retries a failed or simulated write
+        open_valve, button = self._valveTable[valve]
+        open_valve(self.valves)
+        if valve == self.currentValve:
+            return  # Buttons already show this valve open
+
+        button.config(bg=self.OPEN_CLR)
+        if self.currentValve is not None:
+            self._valveTable[self.currentValve][1].config(bg=self.CLOSED_CLR)
 
         self.currentValve = valve
 
@@ -590,12 +652,13 @@ class Display:
 
         # Generate filename for this run
         initials = settings.operator_initials.upper()
-        stamp = datetime.now().strftime("%y%m%d_%H%M%S")
+        started = time.localtime()
+        stamp = time.strftime("%y%m%d_%H%M%S", started)
         self.current_filename = f"{initials}_{stamp}"
 
         # Generate directory path
         base_dir = self.save_dir_var.get()
-        yyyy_mm = datetime.now().strftime("%Y-%m")
+        yyyy_mm = time.strftime("%Y-%m", started)
         full_dir = os.path.join(base_dir, yyyy_mm)
 
         # Create directory if needed
@@ -609,42 +672,46 @@ class Display:
             return
 
         # Set filename with full path
-        full_path = os.path.join(full_dir, self.current_filename + ".txt")
+        full_path = os.path.join(full_dir, self.current_filename + self.daq.fileExtensions[settings.data_format])
         self.daq.set_filename(full_path)
         self.file_path_var.set(f"File will be saved to:\n{full_path}")
 
         # Show filename in UI
         self.filenameVar.set(self.current_filename)
 
+        # Apply a duration edit that is still waiting out its debounce
+        if self._durDebounceId:
+            self.root.after_cancel(self._durDebounceId)
+            self._applyDuration()
+
         # Use effective duration (with 5s buffer)
         self.maxDuration = settings.effective_run_duration
 
         # Get valve schedule from UI
-        settings.valve_schedule = self._get_valve_schedule()
+        settings.valve_times, settings.valve_targets = self._get_valve_schedule()
 
         # Set initial valve
-        self.currentValve = self.initialValveVar.get()
-        self._setValveState(self.currentValve)
+        self._setValveState(self.initialValveVar.get())
 
         # Clear any existing swap jobs
         for job_id in self.swap_job_ids:
             self.root.after_cancel(job_id)
         self.swap_job_ids = []
 
-        # Schedule all valve swaps
-        for swap_time, valve_target in settings.valve_schedule:
-            if swap_time > 0 and swap_time < self.maxDuration:
-                job_id = self.root.after(
-                    int(swap_time * 1000),
-                    lambda v=valve_target: self._setValveState(v)
-                )
-                self.swap_job_ids.append(job_id)
+        # Schedule all valve swaps that fall inside the run
+        in_run = (settings.valve_times > 0) & (settings.valve_times < self.maxDuration)
+        delays_ms = (settings.valve_times[in_run] * 1000).astype(int)
+        for delay_ms, valve_target in zip(delays_ms.tolist(), settings.valve_targets[in_run].tolist()):
+            job_id = self.root.after(delay_ms, partial(self._setValveState, valve_target))
+            self.swap_job_ids.append(job_id)
 
-        self.xData.clear()
-        self.yData.clear()
-        self.line.set_data([], [])
+        self.dataRing.clear()  # Drop blocks left over from the last run
+        self._resetPlotData()
+        if self.canvas is not None:
+            self.line.set_data([], [])
+        self._limits = None  # Fit the axes to the new run
 
-        self.startTime = time.perf_counter()
+        self.startTime_ns = time.monotonic_ns()
         self.recording = True
         self.daq.start()
 
@@ -673,42 +740,219 @@ class Display:
     #  Main update loop
     # ──────────────────────────────────────────────────────────
     def updateLoop(self):
-        while not self.dataQueue.empty():
-            t_rel, v = self.dataQueue.get_nowait()
-            self.xData.append(t_rel)
-            self.yData.append(v)
-
-        if self.xData:
-            elapsed = self.xData[-1]
+        rows = self.dataRing.pop_all()
+        if len(rows):
+            self._appendPlotData(rows)
+        n = self._n
+        x = self._x[:n]
+        y = self._y[:n]
+
+        if n:
+            elapsed = x[-1]
             remaining = max(0.0, self.maxDuration - elapsed)
 
-            self.timeVar.set(f"{elapsed:.4f}")
-            self.remainingVar.set(f"{remaining:.4f}")
-            self.signalVar.set(f"{self.yData[-1]:.4f}")
+            # Plot only every display_decimation ticks
+            self._tickCount += 1
+            if self._tickCount % settings.display_decimation == 0:
+                self._updatePlot(x, y)
 
-            self.line.set_data(self.xData, self.yData)
+            # Readout text is refreshed once Tk is idle, so it never delays the plot
+            # The signal readout shows the latest block's mean, as logged to file
+            self.root.after_idle(self._refreshLabels, elapsed, remaining, y[-self.daq.blockSize:].mean())
 
-            xmin = self.xData[0]
-            xmax = self.xData[-1]
-            pad_x = max(1e-6, (xmax - xmin) * 0.02)
-            self.ax.set_xlim(xmin - pad_x, xmax + pad_x)
+            if self.recording and elapsed >= self.maxDuration:
+                self.stopRecording()
+
+        self.jobId = self.root.after(self.blockMS, self.updateLoop)
+
+    def _refreshLabels(self, elapsed, remaining, volts):
+        """Update the live readouts, only calling into Tcl for text that actually changed."""
+        time_str = f"{elapsed:.4f}"
+        if time_str != self._timeStr:
+            self._timeStr = time_str
+            self.timeVar.set(time_str)
+        rem_str = f"{remaining:.4f}"
+        if rem_str != self._remStr:
+            self._remStr = rem_str
+            self.remainingVar.set(rem_str)
+        sig_str = f"{volts:.4f}"
+        if sig_str != self._sigStr:
+            self._sigStr = sig_str
+            self.signalVar.set(sig_str)
+
+    def _updatePlot(self, x, y):
+        """Hand the decimated history to the line and redraw it."""
+        if self.canvas is None:
+            self._updateTkTrace(x, y)
+            return
+
+        xs, ys = self._decimate(x, y, int(self.ax.bbox.width))
+        self.line.set_data(xs, ys)
 
-            if self.autoscaleVar.get():
-                ymin = min(self.yData)
-                ymax = max(self.yData)
+        # Limits are only moved when the data leaves them, since changing them forces a full redraw
+        xlim, ylim = self._limits or (None, None)
+
+        xmin = x[0]
+        xmax = x[-1]
+        if xlim is None or xmin < xlim[0] or xmax > xlim[1]:
+            pad_x = max(1e-6, (xmax - xmin) * 0.02)
+            # Extra room on the right so time can advance for a while before the next change
+            xlim = (xmin - pad_x, xmax + 5 * pad_x)
+
+        if self.autoscaleVar.get():
+            # Running extremes of the whole run, kept up to date by _appendPlotData
+            ymin = self._ymin
+            ymax = self._ymax
+            # Refit when the data leaves the limits or fills less than half of them
+            if ylim is None or ymin < ylim[0] or ymax > ylim[1] or ymax - ymin < 0.5 * (ylim[1] - ylim[0]):
                 pad_y = max(1e-6, (ymax - ymin) * 0.05)
-                self.ax.set_ylim(ymin - pad_y, ymax + pad_y)
-            else:
-                lims = self._manualYLimits()
-                if lims:
-                    self.ax.set_ylim(lims)
+                ylim = (ymin - pad_y, ymax + pad_y)
+        else:
+            ylim = self._manualYLimits() or self.ax.get_ylim()
+
+        if (xlim, ylim) != self._limits or self._background is None:
+            # Axes changed: full redraw, which re-caches the background in _onDraw
+            self._limits = (xlim, ylim)
+            self.ax.set_xlim(xlim)
+            self.ax.set_ylim(ylim)
+            self.canvas.draw_idle()
+        else:
+            self._blitLine()
 
-            self.fig.canvas.draw_idle()
+    # ──────────────────────────────────────────────────────────
+    #  Plot data
+    # ──────────────────────────────────────────────────────────
+    def _resetPlotData(self):
+        """Empty the plot history, sized for one full run of samples."""
+        capacity = (int(math.ceil(self.maxDuration / self.blockDt)) + 16) * self.daq.blockSize
+        self._x = np.empty(capacity)
+        self._y = np.empty(capacity)
+        self._n = 0
+        self._ymin = math.inf
+        self._ymax = -math.inf
+
+    def _appendPlotData(self, rows):
+        """Append [t_rel, *block volts] rows sample by sample, doubling the arrays if the run outgrows them."""
+        end = self._n + rows[:, 1:].size
+        if end > len(self._x):
+            capacity = max(end, 2 * len(self._x))
+            self._x = np.resize(self._x, capacity)
+            self._y = np.resize(self._y, capacity)
+        self._x[self._n:end] = (rows[:, :1] + self._blockOffsets).ravel()
+        volts = rows[:, 1:]
+        self._y[self._n:end] = volts.ravel()
+        # Extend the running extremes with just the new samples, so autoscale never rescans the history
+        self._ymin = min(self._ymin, volts.min())
+        self._ymax = max(self._ymax, volts.max())
+        self._n = end
+
+    def _decimate(self, x, y, width):
+        """Reduce the history to about one bin per pixel, keeping each bin's min and max in time order,
+        so short spikes survive; the newest sample closes the last bin."""
+        n = len(x)
+        step = max(1, n // max(1, width))
+        if step <= 2:
+            return x, y
+        bins = n // step
+        start = n - bins * step  # Oldest few samples that don't fill a bin are dropped
+        xb = x[start:].reshape(bins, step)
+        yb = y[start:].reshape(bins, step)
+        lo = yb.argmin(axis=1)
+        hi = yb.argmax(axis=1)
+        rows = np.arange(bins)
+        first = np.minimum(lo, hi)
+        second = np.maximum(lo, hi)
+
+        xs = np.empty(2 * bins)
+        ys = np.empty(2 * bins)
+        xs[0::2] = xb[rows, first]
+        xs[1::2] = xb[rows, second]
+        ys[0::2] = yb[rows, first]
+        ys[1::2] = yb[rows, second]
+        return xs, ys
 
-            if self.recording and elapsed >= self.maxDuration:
-                self.stopRecording()
+    # ──────────────────────────────────────────────────────────
+    #  Plot backends
+    # ──────────────────────────────────────────────────────────
+    def _buildMplPlot(self):
+        """Matplotlib figure with labelled axes."""
+        # Built through the OO API so the figure stays out of pyplot's global figure manager
+        self.fig = Figure(figsize=(6, 4))
+        self.ax = self.fig.add_subplot(111)
+        self.ax.set_xlabel("Time (s)")
+        self.ax.set_ylabel("Signal (V)")
 
-        self.jobId = self.root.after(self.blockMS, self.updateLoop)
+        # The line is blitted over a cached background; full draws only happen when the axes change
+        self.line, = self.ax.plot([], [], lw=1.3, animated=True)
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.control_tab)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self._background = None
+        self._limits = None
+        self.canvas.mpl_connect("draw_event", self._onDraw)
+
+    def _buildTkTrace(self):
+        """Plain Tk canvas: one polyline plus corner labels for the visible range."""
+        self.canvas = None
+        self._limits = None
+        self.traceCanvas = tk.Canvas(self.control_tab, height=400, bg="white", highlightthickness=0)
+        self.traceCanvas.pack(fill=tk.BOTH, expand=True)
+        self._traceId = self.traceCanvas.create_line(0, 0, 0, 0, fill="#1f77b4", width=1.3)
+        self._yMaxText = self.traceCanvas.create_text(4, 4, anchor="nw", text="")
+        self._yMinText = self.traceCanvas.create_text(4, 0, anchor="sw", text="")
+        self._xMaxText = self.traceCanvas.create_text(0, 0, anchor="se", text="")
+
+    def _updateTkTrace(self, x, y):
+        """Redraw the Tk canvas trace; the whole polyline is replaced in one coords call."""
+        width = self.traceCanvas.winfo_width()
+        height = self.traceCanvas.winfo_height()
+        if width < 2 or height < 2:
+            return  # Not mapped yet
+
+        xs, ys = self._decimate(x, y, width)
+
+        xmin = x[0]
+        xmax = x[-1]
+        pad_x = max(1e-6, (xmax - xmin) * 0.02)
+        x0, x1 = xmin - pad_x, xmax + pad_x
+
+        lims = None if self.autoscaleVar.get() else self._manualYLimits()
+        if lims:
+            y0, y1 = lims
+        else:
+            ymin = self._ymin
+            ymax = self._ymax
+            pad_y = max(1e-6, (ymax - ymin) * 0.05)
+            y0, y1 = ymin - pad_y, ymax + pad_y
+
+        coords = np.empty(2 * max(len(xs), 2))
+        coords[0:2 * len(xs):2] = (xs - x0) * (width / (x1 - x0))
+        coords[1:2 * len(ys):2] = (y1 - ys) * (height / (y1 - y0))
+        if len(xs) == 1:
+            coords[2:] = coords[:2]  # A line needs two points
+        self.traceCanvas.coords(self._traceId, coords.tolist())
+
+        if (x1, y0, y1) != self._limits:
+            self._limits = (x1, y0, y1)
+            self.traceCanvas.itemconfigure(self._yMaxText, text=f"{y1:.4f} V")
+            self.traceCanvas.coords(self._yMinText, 4, height - 4)
+            self.traceCanvas.itemconfigure(self._yMinText, text=f"{y0:.4f} V")
+            self.traceCanvas.coords(self._xMaxText, width - 4, height - 4)
+            self.traceCanvas.itemconfigure(self._xMaxText, text=f"{xmax:.1f} s")
+
+    # ──────────────────────────────────────────────────────────
+    #  Blitting
+    # ──────────────────────────────────────────────────────────
+    def _onDraw(self, event):
+        """After every full draw (limit change, resize), cache the background and paint the line."""
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.line)
+
+    def _blitLine(self):
+        """Redraw only the line over the cached background."""
+        self.canvas.restore_region(self._background)
+        self.ax.draw_artist(self.line)
+        self.canvas.blit(self.ax.bbox)
 
     # ──────────────────────────────────────────────────────────
     #  Utility helpers
@@ -729,13 +973,6 @@ class Display:
         except ValueError:
             return default
 
-    # Manual override buttons
-    def toggleValveA(self):
-        self._setValveState("A")
-
-    def toggleValveB(self):
-        self._setValveState("B")
-
     # Clean shutdown
     def closeWindow(self):
         if self.recording:
@@ -751,6 +988,8 @@ class Display:
         if self.auto_run_job:
             self.root.after_cancel(self.auto_run_job)
 
+        self.daq.close()  # Wait for the last run to finish saving
+
         self.root.destroy()
 
 
@@ -3,7 +3,9 @@ from dataclasses import dataclass, field
 from typing import Dict, Any, List, Tuple
 import os
 
-@dataclass
+import numpy as np
+
+@dataclass(slots=True)
 class Settings:
     # Board configuration
     ai_board_number: int =0 # Analog input board number
@@ -23,10 +25,28 @@ class Settings:
     auto_run: bool = False  # Enable auto-run feature
     auto_run_interval: int = 600  # Seconds between runs (default 10 minutes)
 
-    # Valve scheduling - now a list of (time, valve) pairs
-    valve_schedule: List[Tuple[float, str]] = field(default_factory=lambda: [
-        (15.0, "B")  # Default: swap to B at 15s
-    ])
+    # Display parameters
+    display_decimation: int = 3  # Redraw the plot every N acquisition blocks
+    plot_backend: str = "mpl"  # "mpl" (Matplotlib axes) or "tkcanvas" (plain Tk canvas trace, much lighter)
+    data_format: str = "text"  # "text" (tab-separated, 4 dp) or "binary" (raw little-endian float64 pairs, .bin)
+
+    # Valve scheduling - parallel arrays of swap times and target valves, sorted by time.
+    # Left out of the generated __eq__, which would compare the arrays elementwise and fail.
+    valve_times: np.ndarray = field(default_factory=lambda: np.array([15.0]), compare=False)  # Default: swap to B at 15s
+    valve_targets: np.ndarray = field(default_factory=lambda: np.array(["B"]), compare=False)
+
+    @property
+    def valve_schedule(self) -> List[Tuple[float, str]]:
+        """The valve schedule as a list of (time, valve) pairs"""
+        return list(zip(self.valve_times.tolist(), self.valve_targets.tolist()))
+
+    @valve_schedule.setter
+    def valve_schedule(self, schedule: List[Tuple[float, str]]) -> None:
+        times = np.array([t for t, _ in schedule], dtype=np.float64)
+        targets = np.array([v for _, v in schedule], dtype="<U1")
+        order = np.argsort(times, kind="stable")
+        self.valve_times = times[order]
+        self.valve_targets = targets[order]
 
     # Properties for synchronization
     @property
@@ -37,25 +57,29 @@ class Settings:
     # Helpers
     def validate(self) -> None:
         """Raise ValueError if any field is outside a sane range."""
-        if not (0 <= self.ai_board_number <= 15):
-            raise ValueError("AI board number must be between 0 and 15 (inclusive)")
-        if not (0 <= self.dio_board_number <= 15):
-            raise ValueError("DIO board number must be between 0 and 15 (inclusive)")
-        if not (0 <= self.ai_channel <= 15):
-            raise ValueError("AI channel must be between 0 and 15 (inclusive)")
+        ids = (self.ai_board_number, self.dio_board_number, self.ai_channel)
+        if min(ids) < 0 or max(ids) > 15:
+            raise ValueError("AI board, DIO board and AI channel numbers must be between 0 and 15 (inclusive)")
         if self.sampling_frequency <= 0:
             raise ValueError("sampling_frequency must be positive")
         if self.block_size <= 0:
             raise ValueError("block_size must be positive")
         if self.run_duration <= 0:
             raise ValueError("run_duration must be positive")
-        for time, valve in self.valve_schedule:
-            if time < 0:
-                raise ValueError(f"valve time cannot be negative")
-            if valve not in ("A", "B"):
-                raise ValueError(f"valve must be 'A' or 'B'")
+        if len(self.valve_times) != len(self.valve_targets):
+            raise ValueError("valve_times and valve_targets must be the same length")
+        if (self.valve_times < 0).any():
+            raise ValueError("valve time cannot be negative")
+        if not np.isin(self.valve_targets, ("A", "B")).all():
+            raise ValueError("valve must be 'A' or 'B'")
         if self.auto_run_interval <= 0:
             raise ValueError("auto_run_interval must be positive")
+        if self.display_decimation < 1:
+            raise ValueError("display_decimation must be at least 1")
+        if self.plot_backend not in ("mpl", "tkcanvas"):
+            raise ValueError("plot_backend must be 'mpl' or 'tkcanvas'")
+        if self.data_format not in ("text", "binary"):
+            raise ValueError("data_format must be 'text' or 'binary'")
 
     # Easy‑to‑read dump (handy for logging)
     def as_dict(self) -> Dict[str, Any]:
@@ -70,6 +94,9 @@ class Settings:
             "operator_initials": self.operator_initials,
             "auto_run": self.auto_run,
             "auto_run_interval": self.auto_run_interval,
+            "display_decimation": self.display_decimation,
+            "plot_backend": self.plot_backend,
+            "data_format": self.data_format,
             "valve_schedule": list(self.valve_schedule),
         }
 
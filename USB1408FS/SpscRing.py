@@ -0,0 +1,55 @@
+# SpscRing.py
+import numpy as np
+
+
+class SpscRing:
+    """Fixed-size ring of float64 rows for one producer thread and one consumer thread.
+
+    The producer only ever writes ``head`` and the consumer only ever writes
+    ``tail``. A row is filled before ``head`` is advanced past it, and plain
+    int attribute stores are atomic under the GIL, so neither side needs a lock.
+    When the consumer falls a whole ring behind, the producer overwrites the
+    oldest rows and the consumer skips whatever was overwritten.
+    """
+
+    def __init__(self, capacity: int, width: int):
+        self._rows = np.empty((capacity, width), dtype=np.float64)
+        self._capacity = capacity
+        self.head = 0  # rows ever pushed; written by the producer only
+        self.tail = 0  # rows ever popped; written by the consumer only
+
+    # Producer side
+    def push(self, first: float, rest: np.ndarray) -> None:
+        """Store one row as ``first`` followed by ``rest``, overwriting the oldest row if the ring is full."""
+        head = self.head
+        row = self._rows[head % self._capacity]
+        row[0] = first
+        row[1:] = rest
+        self.head = head + 1  # publish only once the row is complete
+
+    # Consumer side
+    def pop_all(self) -> np.ndarray:
+        """Copy out every row pushed since the last call that is still intact, oldest first."""
+        head = self.head
+        tail = max(self.tail, head - self._capacity)  # older rows are already overwritten
+        if head == tail:
+            return self._rows[:0]
+
+        start = tail % self._capacity
+        stop = start + (head - tail)
+        if stop <= self._capacity:
+            rows = self._rows[start:stop].copy()
+        else:
+            rows = np.concatenate((self._rows[start:], self._rows[:stop - self._capacity]))
+
+        # The producer may have lapped the copy; drop rows it could have been writing over.
+        # Row i is safe while the producer's next write (head) is less than i + capacity.
+        lost = self.head - self._capacity + 1 - tail
+        if lost > 0:
+            rows = rows[lost:]
+        self.tail = head
+        return rows
+
+    def clear(self) -> None:
+        """Drop everything not yet popped."""
+        self.tail = self.head
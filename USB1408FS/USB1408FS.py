@@ -1,5 +1,10 @@
+import logging
+
 from Display import main as run_gui
 
 if __name__ == "__main__":
+    # Valve messages go through logging; show warnings and errors, keep per-switch debug lines quiet
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
     # Launch the Tkinter interface
     run_gui()
\ No newline at end of file
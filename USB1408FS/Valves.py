@@ -1,46 +1,76 @@
+import logging
+
 from mcculw import ul
 from mcculw.enums import DigitalPortType
 from time import sleep
 
 from Settings import settings
+from BoardProbe import configOutputPort
+
+logger = logging.getLogger(__name__)
+
+# Valve lines on FIRSTPORTA; they are active low (0 = valve ON)
+VALVE_A_BIT = 1 << 0
+VALVE_B_BIT = 1 << 1
 
 class Valves:
     def __init__(self):
         self.board_num = settings.dio_board_number
+        self._port = DigitalPortType.FIRSTPORTA
         self._hardware_available = False
 
         try:
-            # Try to access the board to verify it exists
-            ul.get_board_name(self.board_num)
-            ul.d_config_port(self.board_num, DigitalPortType.FIRSTPORTA, 1)
+            # Verify the board exists and configure all digital I/O bits as outputs
+            configOutputPort(self.board_num, self._port)
             self._hardware_available = True
         except Exception as e:
-            print(f"Warning: Digital I/O board {self.board_num} not found. Valve controls will be simulated.")
+            logger.warning("Digital I/O board %s not found. Valve controls will be simulated.", self.board_num)
             self._hardware_available = False
 
+        # Shadow of the port's output value, so valve writes only change the valve bits
+        self._portValue: int | None = None
+        if self._hardware_available:
+            try:
+                self._portValue = ul.d_in(self.board_num, self._port)
+            except Exception:
+                pass
+
+    def _writeBits(self, set_bits: int, clear_bits: int) -> None:
+        """Drive set_bits high and clear_bits low on the valve port, leaving its other lines as they were."""
+        if self._portValue is None:
+            # The port couldn't be read back, so set each bit on its own rather than guess at the other lines
+            for bit in range(8):
+                mask = 1 << bit
+                if (set_bits | clear_bits) & mask:
+                    ul.d_bit_out(self.board_num, self._port, bit, 1 if set_bits & mask else 0)
+            return
+
+        # One port write switches both valves together
+        value = (self._portValue & ~clear_bits) | set_bits
+        ul.d_out(self.board_num, self._port, value)
+        self._portValue = value
+
     # Function to switch to Position A (open Valve A, close Valve B)
     def set_valve_position_a(self) -> None:
         if not self._hardware_available:
-            print("Simulating valve A open")
+            logger.debug("Simulating valve A open")
             return
 
         try:
-            ul.d_bit_out(self.board_num, DigitalPortType.FIRSTPORTA, 0, 0)  # Valve A ON
-            ul.d_bit_out(self.board_num, DigitalPortType.FIRSTPORTA, 1, 1)  # Valve B OFF
+            self._writeBits(set_bits=VALVE_B_BIT, clear_bits=VALVE_A_BIT)  # Valve A ON, Valve B OFF
         except Exception as e:
-            print(f"Error setting valve A: {str(e)}")
+            logger.error("Error setting valve A: %s", e)
 
     # Function to switch to Position B (open Valve B, close Valve A)
     def set_valve_position_b(self) -> None:
         if not self._hardware_available:
-            print("Simulating valve B open")
+            logger.debug("Simulating valve B open")
             return
 
         try:
-            ul.d_bit_out(self.board_num, DigitalPortType.FIRSTPORTA, 0, 1)  # Valve A OFF
-            ul.d_bit_out(self.board_num, DigitalPortType.FIRSTPORTA, 1, 0)  # Valve B ON
+            self._writeBits(set_bits=VALVE_A_BIT, clear_bits=VALVE_B_BIT)  # Valve A OFF, Valve B ON
         except Exception as e:
-            print(f"Error setting valve B: {str(e)}")
+            logger.error("Error setting valve B: %s", e)
 
 
 def testValves():
@@ -5,15 +5,18 @@ from mcculw.enums import ULRange
 from mcculw.ul import ULError
 import ctypes as ct
 import threading, queue, time
-from datetime import datetime
 import os
 
 from Settings import settings
+from SpscRing import SpscRing
+from BoardProbe import checkBoard
 
 
 class DataAcquisition:
     blockSize = 100
     samplingFrequency = 10_000  # Hz
+    macEpochOffset = 2_082_844_800  # seconds from 1904-01-01 to 1970-01-01
+    fileExtensions = {"text": ".txt", "binary": ".bin"}  # data file extension for each settings.data_format
 
     def __init__(self):
         # Board-specific settings (updated to use settings)
@@ -24,7 +27,10 @@ class DataAcquisition:
 
         try:
             # Try to access the board to verify it exists
-            ul.get_board_name(self.board_num)
+            checkBoard(self.board_num)
+            # counts -> volts is linear for a fixed range, so derive it once
+            self._offset = ul.to_eng_units(self.board_num, self.ai_range, 0)
+            self._scale = (ul.to_eng_units(self.board_num, self.ai_range, 4096) - self._offset) / 4096
             self._hardware_available = True
         except ULError:
             print(f"Warning: Analog input board {self.board_num} not found. Running in simulation mode.")
@@ -32,108 +38,214 @@ class DataAcquisition:
 
         # Pre-allocate one-block buffer
         self._buf = (ct.c_uint16 * self.blockSize)()
+        self._counts = np.frombuffer(self._buf, dtype=np.uint16)  # zero-copy view of _buf
+        self._scratch = np.empty(self.blockSize, dtype=np.float64)
 
-        # Run bookkeeping
-        self.data: list[tuple[float, float]] = []
+        # One period of the simulated signal, looked up instead of calling np.sin per block
+        self._sineTable = 2.5 + 2.5 * np.sin(np.linspace(0, 2 * np.pi, 4096, endpoint=False))
+
+        # Run bookkeeping: one (elapsed s, volts) row per block, preallocated and grown by doubling.
+        # Rows are turned into seconds since 1904 in one step when the run is saved.
+        self._resetRunData()
 
         # initial file name
         self.filename = None
+        self.data_format = settings.data_format
 
         # Threading helpers
-        self._queue: queue.Queue | None = None
+        self._ring: SpscRing | None = None
         self._thread: threading.Thread | None = None
-        self._running = threading.Event()
+        self._stop = threading.Event()  # set to ask the worker to finish
+        self._runStartMacEpoch = 0.0
+
+        # Finished runs are saved by a writer thread so stop() never waits on file I/O
+        self._writeQueue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._writeLoop, daemon=True)
+        self._writer.start()
 
     def set_filename(self, filename):
+        # The format is fixed with the name, so the saved file always matches the extension shown
         self.filename = filename
+        self.data_format = settings.data_format
 
     # Public control surface
-    def attach_queue(self, q: queue.Queue) -> None:
-        """GUI supplies a queue to receive (t_rel, volts)."""
-        self._queue = q
+    def attach_ring(self, ring: SpscRing) -> None:
+        """GUI supplies a ring to receive [t_rel, *block volts] rows, t_rel taken at the block's last sample."""
+        self._ring = ring
 
     def start(self) -> None:
         if self._thread and self._thread.is_alive():
             return
-        self._running.set()
+        self._stop.clear()
         self._thread = threading.Thread(target=self._worker, daemon=True)
         self._thread.start()
 
     def stop(self, join_timeout: float = 1.0) -> None:
-        self._running.clear()
+        self._stop.set()
         if self._thread:
             self._thread.join(timeout=join_timeout)
             self._thread = None
-        self.writeData(self.data)  # auto-save
-        self.data = []  # clear for next run
+        data = np.column_stack((self._runStartMacEpoch + self._ts[:self._n], self._v[:self._n]))
+        self._writeQueue.put((self.filename, self.data_format, data))  # auto-save on the writer thread
+        self._resetRunData()  # clear for next run
+
+    def close(self) -> None:
+        """Stop any run, then wait for the writer thread to finish saving."""
+        self.stop()
+        self._writeQueue.put(None)
+        self._writer.join()
 
     # Background worker — runs in its own thread
     def _worker(self) -> None:
-        t0 = time.perf_counter()
-        while self._running.is_set():
-            volts = self.getSignalData()
-            if volts is None:
-                continue  # skip bad scan, keep running
-
-            t_rel = time.perf_counter() - t0
-            epoch1904 = self.getTimeData()
-            self.recordData(epoch1904, volts)
-
-            if self._queue:
-                try:
-                    self._queue.put_nowait((t_rel, volts))
-                except queue.Full:  # drop oldest if GUI lags
-                    _ = self._queue.get_nowait()
-                    self._queue.put_nowait((t_rel, volts))
+        # Integer ns clock for elapsed time, so precision doesn't drift over a long run;
+        # seconds since 1904 are taken once per run and offset by the elapsed time
+        t0_ns = time.monotonic_ns()
+        self._runStartMacEpoch = self.getTimeData()
+        blockPeriod = self.blockSize / self.samplingFrequency
+        backoff = blockPeriod
+
+        # Per-block lookups bound once as locals
+        monotonic_ns = time.monotonic_ns
+        stopped = self._stop.is_set
+        wait = self._stop.wait
+        read_into = self.read_into
+        record = self.recordData
+        scratch = self._scratch
+        simulated = not self._hardware_available
+        ring = self._ring
+
+        while not stopped():
+            if not read_into(scratch):
+                # Skip the bad scan and keep running, but back off so a lost board doesn't spin a core.
+                # Waiting on the stop event keeps stop() from having to sit out the delay.
+                wait(backoff)
+                backoff = min(2 * backoff, 1.0)
+                continue
+            backoff = blockPeriod
+            if simulated:
+                wait(blockPeriod)  # the simulated scan doesn't block like a_in_scan does
+            volts = float(scratch.mean())  # the file logs one averaged point per block
+
+            t_rel = (monotonic_ns() - t0_ns) * 1e-9
+            record(t_rel, volts)
+
+            if ring:
+                # The plot gets the whole block, copied into the ring's row
+                ring.push(t_rel, scratch)  # overwrites the oldest if the GUI is a full ring behind
             # a_in_scan blocks ≈ blockSize/samplingFrequency
-            # so no extra sleep is needed
+            # so no extra sleep is needed with hardware
+
+    def _writeLoop(self) -> None:
+        while True:
+            job = self._writeQueue.get()
+            if job is None:
+                return
+            filename, data_format, data = job
+            if data_format == "binary":
+                self.writeDataBinary(data, filename)
+            else:
+                self.writeData(data, filename)
 
     # Low-level helpers
-    def getSignalData(self) -> float | None:
+    def read_into(self, out: np.ndarray) -> bool:
+        """Scan one block and write it to ``out`` in volts. Returns False on a bad scan."""
         if not self._hardware_available:
-            # Simulate a sine wave when hardware isn't available
-            return 2.5 + 2.5 * np.sin(time.perf_counter() * 2 * np.pi * 0.1)
+            out.fill(self._simulatedVolts())
+            return True
 
+        if not self._scan():
+            return False
+
+        np.multiply(self._counts, self._scale, out=out)
+        out += self._offset
+        return True
+
+    def _scan(self) -> bool:
+        """Scan one block of raw counts into _buf. Returns False on a bad scan."""
+        # mcculw calls cbAInScan through a ctypes WinDLL, which releases the GIL for the
+        # duration of the call, so the GUI thread keeps running while this blocks
         try:
             ul.a_in_scan(self.board_num,
                          self.channel, self.channel,
                          self.blockSize, self.samplingFrequency,
                          self.ai_range, self._buf, 0)
-
-            counts = np.ctypeslib.as_array(self._buf).mean()
-            return float(ul.to_eng_units(self.board_num, self.ai_range, int(counts)))
         except ULError as e:
             print("UL error:", e.errorcode, e.message)
-            return None
+            return False
+        return True
 
-    def getTimeData(self) -> float:
-        return (datetime.now() - datetime(1904, 1, 1)).total_seconds()
+    def _simulatedVolts(self) -> float:
+        # Simulate a 0.1 Hz sine wave when hardware isn't available
+        return float(self._sineTable[int(time.perf_counter() * 0.1 * 4096) & 4095])
 
-    def recordData(self, epoch1904: float, volts: float) -> None:
-        self.data.append((epoch1904, volts))
+    def getTimeData(self) -> float:
+        """Local wall-clock time in seconds since 1904-01-01."""
+        now = time.time()
+        return now + time.localtime(now).tm_gmtoff + self.macEpochOffset
+
+    def recordData(self, t_rel: float, volts: float) -> None:
+        n = self._n
+        if n == len(self._ts):
+            self._ts = np.resize(self._ts, 2 * n)
+            self._v = np.resize(self._v, 2 * n)
+        self._ts[n] = t_rel
+        self._v[n] = volts
+        self._n = n + 1
+
+    def _resetRunData(self) -> None:
+        # Sized for a full run so the arrays normally never grow mid-run
+        capacity = max(1, int(settings.run_duration * self.samplingFrequency / self.blockSize) + 1)
+        self._ts = np.empty(capacity)
+        self._v = np.empty(capacity)
+        self._n = 0
 
     # File I/O
-    def writeData(self, data: list[tuple[float, float]]) -> None:
-        if not data or not self.filename:
+    def writeData(self, data: np.ndarray, filename: str | None = None) -> None:
+        filename = filename or self.filename
+        if not len(data) or not filename:
+            return
+
+        try:
+            # Get directory path and ensure it exists
+            dir_path = os.path.dirname(filename)
+            if dir_path:  # Only try to create if there is a directory component
+                os.makedirs(dir_path, exist_ok=True)
+
+            # Format: "[time since Jan 1st 1904] TAB [Signal up to 4 decimal places]"
+            # The whole file is formatted by one % operation and written in one call
+            blob = ("%.4f\t%.4f\n" * len(data)) % tuple(data.ravel().tolist())
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(blob)
+
+            print(f"Successfully saved {len(data)} rows to {filename}")
+
+        except PermissionError as e:
+            print(f"Error: Permission denied when writing to {filename}: {str(e)}")
+        except OSError as e:
+            print(f"Error writing to {filename}: {str(e)}")
+        except Exception as e:
+            print(f"Unexpected error saving data: {str(e)}")
+
+    def writeDataBinary(self, data: np.ndarray, filename: str | None = None) -> None:
+        """Save rows as raw little-endian float64 (epoch1904, volts) pairs, full precision."""
+        filename = filename or self.filename
+        if not len(data) or not filename:
             return
 
         try:
             # Get directory path and ensure it exists
-            dir_path = os.path.dirname(self.filename)
+            dir_path = os.path.dirname(filename)
             if dir_path:  # Only try to create if there is a directory component
                 os.makedirs(dir_path, exist_ok=True)
 
-            # Write the data file
-            with open(self.filename, "w", encoding="utf-8") as f:
-                for epoch, v in data:
-                    # Format: "[time since Jan 1st 1904] TAB [Signal up to 4 decimal places]"
-                    f.write(f"{epoch:.4f}\t{v:.4f}\n")
+            # Read back with np.fromfile(path, "<f8").reshape(-1, 2)
+            np.ascontiguousarray(data, dtype="<f8").tofile(filename)
 
-            print(f"Successfully saved {len(data)} rows to {self.filename}")
+            print(f"Successfully saved {len(data)} rows to {filename}")
 
         except PermissionError as e:
-            print(f"Error: Permission denied when writing to {self.filename}: {str(e)}")
+            print(f"Error: Permission denied when writing to {filename}: {str(e)}")
         except OSError as e:
-            print(f"Error writing to {self.filename}: {str(e)}")
+            print(f"Error writing to {filename}: {str(e)}")
         except Exception as e:
-            print(f"Unexpected error saving data: {str(e)}")
\ No newline at end of file
+            print(f"Unexpected error saving data: {str(e)}")
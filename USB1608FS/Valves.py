@@ -1,62 +1,92 @@
+import logging
+
 from mcculw import ul
 from mcculw.enums import DigitalPortType
 from time import sleep
 
 from Settings import settings
+from BoardProbe import configOutputPort
+
+logger = logging.getLogger(__name__)
+
+# Valve control lines on AUXPORT
+B_CONTROL_BIT = 1 << 1  # DIO1
+A_CONTROL_BIT = 1 << 3  # DIO3
 
 
 class Valves:
     def __init__(self):
         self.board_num = settings.dio_board_number
+        self._port = DigitalPortType.AUXPORT
         self._hardware_available = False
 
         try:
-            # Try to access the board to verify it exists
-            ul.get_board_name(self.board_num)
-            # Configure all digital I/O bits as outputs
-            ul.d_config_port(self.board_num, DigitalPortType.AUXPORT, 1)
+            # Verify the board exists and configure all digital I/O bits as outputs
+            configOutputPort(self.board_num, self._port)
             self._hardware_available = True
         except Exception as e:
-            print(f"Warning: Digital I/O board {self.board_num} not found. Valve controls will be simulated.")
+            logger.warning("Digital I/O board %s not found. Valve controls will be simulated.", self.board_num)
             self._hardware_available = False
 
+        # Shadow of the port's output value, so valve writes only change the valve bits
+        self._portValue: int | None = None
+        if self._hardware_available:
+            try:
+                self._portValue = ul.d_in(self.board_num, self._port)
+            except Exception:
+                pass
+
+    def _writeBits(self, set_bits: int, clear_bits: int) -> None:
+        """Drive set_bits high and clear_bits low on the valve port, leaving its other lines as they were."""
+        if self._portValue is None:
+            # The port couldn't be read back, so set each bit on its own rather than guess at the other lines
+            for bit in range(8):
+                mask = 1 << bit
+                if (set_bits | clear_bits) & mask:
+                    ul.d_bit_out(self.board_num, self._port, bit, 1 if set_bits & mask else 0)
+            return
+
+        # One port write switches both valves together
+        value = (self._portValue & ~clear_bits) | set_bits
+        ul.d_out(self.board_num, self._port, value)
+        self._portValue = value
+
     def _set_valve(self, a_state: int, b_state: int):
         """Set both valve control lines to specified states"""
         if not self._hardware_available:
             return
 
         try:
-            # Set Position B control (DIO1)
-            ul.d_bit_out(self.board_num, DigitalPortType.AUXPORT, 1, b_state)
-            # Set Position A control (DIO3)
-            ul.d_bit_out(self.board_num, DigitalPortType.AUXPORT, 3, a_state)
+            # Position B control is DIO1 and Position A control is DIO3
+            set_bits = (B_CONTROL_BIT if b_state else 0) | (A_CONTROL_BIT if a_state else 0)
+            self._writeBits(set_bits, (B_CONTROL_BIT | A_CONTROL_BIT) & ~set_bits)
 
         except Exception as e:
-            print(f"Error setting valve states: {str(e)}")
+            logger.error("Error setting valve states: %s", e)
 
     def set_valve_position_b(self) -> None:
         if not self._hardware_available:
-            print("Simulating valve B open")
+            logger.debug("Simulating valve B open")
             return
 
         try:
             # Set A high, B low
             self._set_valve(a_state=1, b_state=0)
-            print("Valve set to Position B")
+            logger.debug("Valve set to Position B")
         except Exception as e:
-            print(f"Error setting valve B: {str(e)}")
+            logger.error("Error setting valve B: %s", e)
 
     def set_valve_position_a(self) -> None:
         if not self._hardware_available:
-            print("Simulating valve A open")
+            logger.debug("Simulating valve A open")
             return
 
         try:
             # Set B high, A low
             self._set_valve(a_state=0, b_state=1)
-            print("Valve set to Position A")
+            logger.debug("Valve set to Position A")
         except Exception as e:
-            print(f"Error setting valve A: {str(e)}")
+            logger.error("Error setting valve A: %s", e)
 
 def testValves():
     testValve = Valves()